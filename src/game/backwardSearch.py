@@ -0,0 +1,85 @@
+"""
+Michael Harrington
+
+This file provides the backward half of bidirectional search. Goal
+states fix the boat but not the animals, so the search backwards from
+the goal runs over the boat alone: a uniform cost search over the
+reverse boat moves with only the trees in the way. It is small enough
+to be searched completely before the forward search starts.
+
+Every forward state whose boat pose was reached backwards gets a lower
+bound on its cost to the goal, the pose's backward distance. When the
+animals of the state leave the boat's backward path to the goal clear,
+the forward and backward searches meet: that path can be followed as is
+and the bound is the exact cost of finishing from the state.
+"""
+
+import heapq
+
+"""
+BoatBackwardSearch
+
+distMap[pose] is the cheapest cost of the boat reaching the goal from
+pose, inf when it can not. nextMove[pose] is the first move of such a
+path as (act, resultPose) and corridor[pose] the mask of every cell the
+boat sweeps following it, which must be free of animals for the states
+to meet.
+"""
+class BoatBackwardSearch():
+    def __init__(self, context):
+        self.context = context
+        boatTable = context.boatTable
+        boatCost = context.radField.boatCost
+        treeMask = context.treeMask
+        numPoses = len(boatTable.footprint)
+        self.distMap = [float('inf')] * numPoses
+        self.nextMove = [None] * numPoses
+        self.corridor = [None] * numPoses
+
+        frontier = []
+        for pose, footprint in enumerate(boatTable.footprint):
+            if footprint is not None and footprint & context.goalMask:
+                self.distMap[pose] = 0
+                self.corridor[pose] = 0
+                frontier.append((0, pose))
+        heapq.heapify(frontier)
+        while frontier:
+            dist, pose = heapq.heappop(frontier)
+            if dist > self.distMap[pose]:
+                continue
+            if self.nextMove[pose] is not None:
+                act, resultPose, requiredMask = self.nextMove[pose]
+                self.corridor[pose] = requiredMask | self.corridor[resultPose]
+            newDist = dist + boatCost[pose]
+            for act, prevPose, requiredMask in boatTable.reverseMoves[pose]:
+                if requiredMask & treeMask:
+                    continue
+                if newDist < self.distMap[prevPose]:
+                    self.distMap[prevPose] = newDist
+                    self.nextMove[prevPose] = (act, pose, requiredMask)
+                    heapq.heappush(frontier, (newDist, prevPose))
+
+    def distance(self, boardState):
+        return self.distMap[boardState.poses[0]]
+
+    def completion(self, boardState):
+        # [(boardState, action, stepCost)] finishing the path from boardState
+        # along the backward path, None when the two searches do not meet
+        context = self.context
+        pose = boardState.poses[0]
+        corridor = self.corridor[pose]
+        if corridor is None:
+            return None
+        if corridor & boardState.occupancy & ~context.boatTable.footprint[pose]:
+            return None
+        boatCost = context.radField.boatCost
+        steps = []
+        while self.nextMove[pose] is not None:
+            act, pose, requiredMask = self.nextMove[pose]
+            action = context.slotActions[0][(boardState.poses[0] & 3) * 4 + act]
+            boardState = boardState.applyAction(action)
+            steps.append((boardState, action, boatCost[pose]))
+        return steps
+
+def createBoatBackwardSearch(initialBoardState):
+    return BoatBackwardSearch(initialBoardState.context)
@@ -0,0 +1,131 @@
+"""
+Michael Harrington
+
+This file exposes the batch solver class that solves many puzzles
+over a pool of processes
+"""
+
+from collections import deque
+from Queue import Empty
+import multiprocessing
+import os
+import signal
+import time
+
+from gameSolver import GameSolver
+
+"""
+BatchJob describes one puzzle solve with one algorithm, the results
+are filled in when it ends. status is one of solved, no path, timeout
+or error. Jobs given a cache share it with GameSolver, jobs given a
+telemetryPath write the solver's telemetry there.
+"""
+class BatchJob():
+    def __init__( self, inputPath, outputPath, algName, heurName, algConstructor,
+                  cache=None, solverName=None, telemetryPath=None ):
+        self.inputPath = inputPath
+        self.outputPath = outputPath
+        self.algName = algName
+        self.heurName = heurName
+        self.algConstructor = algConstructor
+        self.cache = cache
+        self.solverName = solverName
+        self.telemetryPath = telemetryPath
+        self.status = None
+        self.pathCost = None
+        self.totalTime = None
+
+def runJob(index, job, results):
+    # Solves one job in its own process group and reports back on results
+    _ownProcessGroup(os.getpid())
+    try:
+        solver = GameSolver(job.algConstructor, job.cache, job.solverName)
+        pathFound = solver.runInputFile(job.inputPath)
+        if job.telemetryPath is not None:
+            with open(job.telemetryPath, 'w') as fileObj:
+                fileObj.write(solver.strTelemetry())
+        if pathFound:
+            with open(job.outputPath, 'w') as fileObj:
+                fileObj.write(solver.strOutput())
+            results.put((index, 'solved', solver.pathSolver.pathCost, solver.totalTime))
+        else:
+            results.put((index, 'no path', None, solver.totalTime))
+    except Exception:
+        results.put((index, 'error', None, None))
+
+"""
+BatchSolver class runs jobs in at most processes processes at once.
+Each job gets a process of its own, leading a process group of its
+own, so a job still running after timeout seconds is stopped without
+touching the others. Stopping a job sends SIGTERM to its whole group.
+Once a job ends its process gets stopGrace seconds to exit, then
+SIGKILL goes to whatever is left in its group, so processes a job
+started never outlive it. Jobs write
+their solution as soon as they end and onFinish(job) is called for
+each one in the order they finish.
+"""
+class BatchSolver():
+    def __init__(self, processes=None, timeout=None, stopGrace=1.0):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.stopGrace = stopGrace
+
+    def run(self, jobs, onFinish=None):
+        waiting = deque(enumerate(jobs))
+        # running[index] :: (process, startTime)
+        running = {}
+        results = multiprocessing.Queue()
+        while waiting or running:
+            while waiting and len(running) < self.processes:
+                index, job = waiting.popleft()
+                process = multiprocessing.Process(target=runJob, args=(index, job, results))
+                process.start()
+                # Set from both sides, whichever runs first wins the race
+                _ownProcessGroup(process.pid)
+                running[index] = (process, time.time())
+
+            finished = []
+            try:
+                index, status, pathCost, totalTime = results.get(timeout=0.05)
+                if index in running:
+                    jobs[index].status = status
+                    jobs[index].pathCost = pathCost
+                    jobs[index].totalTime = totalTime
+                    finished.append(index)
+            except Empty:
+                pass
+
+            now = time.time()
+            for index, (process, startTime) in running.items():
+                if index in finished:
+                    continue
+                if self.timeout is not None and now - startTime > self.timeout:
+                    _signalGroup(process.pid, signal.SIGTERM)
+                    jobs[index].status = 'timeout'
+                    finished.append(index)
+                elif not process.is_alive() and process.exitcode != 0:
+                    jobs[index].status = 'error'
+                    finished.append(index)
+
+            for index in finished:
+                process, startTime = running.pop(index)
+                process.join(self.stopGrace)
+                _signalGroup(process.pid, signal.SIGKILL)
+                process.join()
+                if onFinish is not None:
+                    onFinish(jobs[index])
+        return jobs
+
+def _ownProcessGroup(pid):
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        # The process already ended, or already leads its group
+        pass
+
+def _signalGroup(pgid, signum):
+    try:
+        os.killpg(pgid, signum)
+    except OSError:
+        # Nothing is left in the group
+        pass
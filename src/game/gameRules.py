@@ -5,8 +5,6 @@ This file provides game rules and game abstractions
 """
 
 from itertools import chain
-from copy import copy
-from random import shuffle
 
 from util.cartMath import ( Point,
                             Cardinal,
@@ -14,6 +12,10 @@ from util.cartMath import ( Point,
                             manhattanDistance,
                             rayToPointList,
                           )
+from util.bitBoard import BitBoard
+from moveTables import MoveTable, poseIndex, poseRay
+from radField import RadField
+from puzzleAnalysis import PuzzleAnalysis
 
 """
 Action Rules
@@ -360,6 +362,18 @@ Board State Rules
 BoardState holds the game objects for a defined state.
 The function applyAction can return a successor boardstate
 given a valid action.
+
+Only the movable objects (boat, alligators, turtles) belong to a
+BoardState, stored as integer poses in slot order: boat first, then
+alligators, then turtles. The static parts of a puzzle (board,
+radiation source, goal, trees, move tables and radiation field) live in a PuzzleContext
+that is shared by every state of a search. The poses are also packed
+into a single integer key, so hashing and comparing states is cheap.
+
+Collisions are checked on a bitboard. Every state keeps an occupancy
+mask of everything solid (trees included), which is updated
+incrementally by each move. Game objects are only created when
+something asks for them, e.g. heuristics or printing.
 """
 def createBoardState(board, radSrc, radMag, radDecF, boat, goal, alligs, turts, trees):
     # radSrc :: CardinalRay
@@ -367,84 +381,215 @@ def createBoardState(board, radSrc, radMag, radDecF, boat, goal, alligs, turts,
     # boat :: CardinalRay
     # goal :: Point
     # alligs, turts, trees :: [CardinalRay]
-    return BoardState( Board(board),
-                       RadSource(radSrc, radMag, radDecF),
-                       Boat(boat, index=0),
-                       Goal(goal),
-                       [Alligator(a, index) for index, a in enumerate(alligs)],
-                       [Turtle(t, index) for index, t in enumerate(turts)],
-                       [Tree(t) for t in trees] )
-
-class BoardState():
-    def __init__(self, board, radSrc, boat, goal, alligs, turtles, trees):
+    context = PuzzleContext( Board(board),
+                             RadSource(radSrc, radMag, radDecF),
+                             Goal(goal),
+                             [Tree(t) for t in trees],
+                             alligs,
+                             turts )
+    poses = [context.poseIndex(cardRay) for cardRay in [boat] + alligs + turts]
+    context.analyze(poses)
+    return context.createState(poses)
+
+class PuzzleContext():
+    # Each slot's pose is packed into poseBits bits of the state key
+    def __init__(self, board, radSrc, goal, trees, alligs, turts):
         self.board = board
         self.radSrc = radSrc
-        self.boat = boat
         self.goal = goal
-        self.alligators = alligs
-        self.turtles = turtles
         self.trees = trees
+        self.numAlligators = len(alligs)
+        self.numTurtles = len(turts)
+        self.bitBoard = BitBoard(board.pos.x, board.pos.y)
+        self.poseBits = (self.bitBoard.stride * (board.pos.y + 2) * 4 - 1).bit_length()
+        self.treeMask = self.bitBoard.pointsMask(chain(*[t.space for t in trees]))
+        self.goalMask = self.bitBoard.pointsMask(goal.space)
+
+        # Tables are built once per puzzle and shared between slots of the same kind
+        boatTable = MoveTable(self.bitBoard, Boat)
+        alligatorTable = MoveTable(self.bitBoard, Alligator)
+        turtleTable = MoveTable(self.bitBoard, Turtle)
+        self.boatTable = boatTable
+        self.moveTables = ( [boatTable]
+                          + [alligatorTable] * self.numAlligators
+                          + [turtleTable] * self.numTurtles )
+        self.radField = RadField(radSrc, self.bitBoard, boatTable, self.goalMask)
+        # Moves search may make, slotMoves[slot][pose], narrowed by analyze
+        self.analysis = None
+        self.slotMoves = [table.moves for table in self.moveTables]
+        # With movePruning set search only moves animals relevant to the boat's pose
+        self.movePruning = False
+
+        # Action objects are shared too, slotActions[slot][cardDir * 4 + act]
+        self.slotObjs = ( [(Boat, 0)]
+                        + [(Alligator, index) for index in range(self.numAlligators)]
+                        + [(Turtle, index) for index in range(self.numTurtles)] )
+        self.slotActions = []
+        for objClass, index in self.slotObjs:
+            actions = [None] * 16
+            for cardDir in (Cardinal.down, Cardinal.up, Cardinal.left, Cardinal.right):
+                for action in objClass(CardinalRay(0, 0, cardDir), index).actions:
+                    actions[cardDir * 4 + action.act] = action
+            self.slotActions.append(actions)
+
+    def analyze(self, poses):
+        # Freezes animals that can never matter and drops moves that can never be made
+        self.analysis = PuzzleAnalysis(self, poses)
+        self.slotMoves = self.analysis.slotMoves
+
+    def searchSlots(self, poses):
+        # Slots whose moves search makes from a state with these poses
+        if self.movePruning:
+            return self.analysis.relevantSlots(poses[0])
+        return range(len(poses))
+
+    def poseIndex(self, cardRay):
+        return poseIndex(self.bitBoard, cardRay)
+
+    def packKey(self, poses):
+        key = 0
+        for slot, pose in enumerate(poses):
+            key |= pose << (slot * self.poseBits)
+        return key
+
+    def unpackKey(self, key):
+        poseMask = (1 << self.poseBits) - 1
+        return [(key >> (slot * self.poseBits)) & poseMask for slot in range(len(self.slotObjs))]
+
+    def createState(self, poses):
+        occupancy = self.treeMask
+        for slot, pose in enumerate(poses):
+            occupancy |= self.moveTables[slot].footprint[pose]
+        return BoardState(self, poses, occupancy, self.packKey(poses))
+
+    def actionSlot(self, action):
+        if action.obj == MovableObjs.boat:
+            return 0
+        elif action.obj == MovableObjs.alligator:
+            return 1 + action.objIndex
+        elif action.obj == MovableObjs.turtle:
+            return 1 + self.numAlligators + action.objIndex
+        raise NotImplementedError('Unimplemented movable object: {}'.format(action.obj))
+
+    def createObj(self, slot, pose):
+        objClass, index = self.slotObjs[slot]
+        return objClass(poseRay(self.bitBoard, pose), index)
+
+class BoardState():
+    def __init__(self, context, poses, occupancy, key):
+        self.context = context
+        self.poses = poses
+        self.occupancy = occupancy
+        self.key = key
+        # Game objects are created on demand
+        self._objs = None
 
     @property
-    def actionObjects(self):
-        return [self.boat] + self.alligators + self.turtles
+    def board(self):
+        return self.context.board
 
-    def applyAction(self, action):
-        # Lets return a successor board state but return None if action is invalid.
-        # Also, you need copies of some objects.
-        index = action.objIndex
-        if action.obj == MovableObjs.boat:
-            newBoat = copy(self.boat)
-            newAlligators = self.alligators
-            newTurtles = self.turtles
-            actionObj = newBoat
-            obstacles = (newAlligators + newTurtles + self.trees)
+    @property
+    def radSrc(self):
+        return self.context.radSrc
 
-        elif action.obj == MovableObjs.alligator:
-            newBoat = self.boat
-            newAlligators = copy(self.alligators)
-            newTurtles = self.turtles
-            actionObj = copy(newAlligators[index])
-            newAlligators[index] = actionObj
-            otherAlligators = newAlligators[:index] + newAlligators[index+1:]
-            obstacles = ([newBoat] + otherAlligators + newTurtles + self.trees)
+    @property
+    def goal(self):
+        return self.context.goal
 
-        elif action.obj == MovableObjs.turtle:
-            newBoat = self.boat
-            newAlligators = self.alligators
-            newTurtles = copy(self.turtles)
-            actionObj = copy(newTurtles[index])
-            newTurtles[index] = actionObj
-            otherTurtles = newTurtles[:index] + newTurtles[index+1:]
-            obstacles = ([newBoat] + newAlligators + otherTurtles + self.trees)
+    @property
+    def trees(self):
+        return self.context.trees
 
-        else:
-            raise NotImplementedError('Unimplemented movable object: {}'.format(action.obj))
+    @property
+    def actionObjects(self):
+        if self._objs is None:
+            self._objs = [self.context.createObj(slot, pose) for slot, pose in enumerate(self.poses)]
+        return self._objs
 
-        moveEntity = actionObj.move(action)
-        if not self.board.contains(moveEntity.space):
-            return None
+    @property
+    def boat(self):
+        return self.actionObjects[0]
+
+    @property
+    def alligators(self):
+        return self.actionObjects[1:1+self.context.numAlligators]
 
-        obstacleEntity = MapEntity(chain(*[obst.space for obst in obstacles]))
-        if moveEntity.collision(obstacleEntity):
+    @property
+    def turtles(self):
+        return self.actionObjects[1+self.context.numAlligators:]
+
+    def applyAction(self, action):
+        # Lets return a successor board state but return None if action is invalid.
+        slot = self.context.actionSlot(action)
+        for move in self.context.moveTables[slot].moves[self.poses[slot]]:
+            if move[0] == action.act:
+                return self._successor(slot, move)
+        return None
+
+    def _successor(self, slot, move):
+        # Everything solid except the moving object must stay clear of the move
+        act, resultPose, requiredMask, resultFootprint = move
+        context = self.context
+        pose = self.poses[slot]
+        obstacles = self.occupancy & ~context.moveTables[slot].footprint[pose]
+        if requiredMask & obstacles:
             return None
 
-        return BoardState( self.board,
-                           self.radSrc,
-                           newBoat,
-                           self.goal,
-                           newAlligators,
-                           newTurtles,
-                           self.trees )
+        newPoses = list(self.poses)
+        newPoses[slot] = resultPose
+        shift = slot * context.poseBits
+        newKey = self.key ^ (pose << shift) ^ (resultPose << shift)
+        return BoardState(context, newPoses, obstacles | resultFootprint, newKey)
+
+    def expand(self):
+        # Tests every move against this state's occupancy in one pass and
+        # returns parallel lists of child keys, action codes and step costs.
+        # An action code is slot * 4 + the move's index in slotMoves,
+        # child(code) builds the successor only when it is needed.
+        context = self.context
+        occupancy = self.occupancy
+        key = self.key
+        boatCost = context.radField.boatCost
+        poseBits = context.poseBits
+        stayCost = boatCost[self.poses[0]]
+        keys = []
+        codes = []
+        costs = []
+        for slot in context.searchSlots(self.poses):
+            pose = self.poses[slot]
+            obstacles = occupancy & ~context.moveTables[slot].footprint[pose]
+            shift = slot * poseBits
+            for moveIndex, move in enumerate(context.slotMoves[slot][pose]):
+                if move[2] & obstacles:
+                    continue
+                keys.append(key ^ ((pose ^ move[1]) << shift))
+                codes.append(slot * 4 + moveIndex)
+                # Only boat moves change what the boat is exposed to
+                costs.append(boatCost[move[1]] if slot == 0 else stayCost)
+        return keys, codes, costs
+
+    def child(self, code):
+        # Builds the successor of a legal action code from expand
+        context = self.context
+        slot, moveIndex = divmod(code, 4)
+        pose = self.poses[slot]
+        table = context.moveTables[slot]
+        act, resultPose, requiredMask, resultFootprint = context.slotMoves[slot][pose][moveIndex]
+        newPoses = list(self.poses)
+        newPoses[slot] = resultPose
+        shift = slot * context.poseBits
+        newKey = self.key ^ ((pose ^ resultPose) << shift)
+        newOccupancy = (self.occupancy & ~table.footprint[pose]) | resultFootprint
+        action = context.slotActions[slot][(pose & 3) * 4 + act]
+        return BoardState(context, newPoses, newOccupancy, newKey), action
+
+    def fromKey(self, key):
+        # Rebuilds the state of this puzzle with the given key
+        return self.context.createState(self.context.unpackKey(key))
 
     def getNeighbors(self):
-        for gameObj in self.actionObjects:
-            actions = gameObj.actions
-            shuffle(actions)
-            for action in actions:
-                newBoardState = self.applyAction(action)
-                if newBoardState:
-                    yield newBoardState, action
+        for code in self.expand()[1]:
+            yield self.child(code)
 
     def __str__(self):
         stateStr = ''
@@ -461,44 +606,19 @@ class BoardState():
 
         return stateStr
 
+    # NOTE: States are only comparable within the same puzzle context
     def __eq__(self, other):
-        if self.boat != other.boat:
-            return False
-        for selfTurtle, otherTurtle in zip(self.turtles, other.turtles):
-            if selfTurtle != otherTurtle:
-                return False
-        for selfAlligator, otherAlligator in zip(self.alligators, other.alligators):
-            if selfAlligator != otherAlligator:
-                return False
-        for selfTree, otherTree in zip(self.trees, other.trees):
-            if selfTree != otherTree:
-                return False
-        if any([ len(other.trees) != len(self.trees),
-                 len(other.alligators) != len(self.alligators),
-                 len(other.turtles) != len(self.turtles),
-                 self.goal != other.goal,
-                 self.radSrc != other.radSrc,
-                 self.goal != other.goal,
-              ]):
-            return False
-
-        return True
+        return self.key == other.key and self.context is other.context
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        return hash(( self.board,
-                      self.radSrc,
-                      self.boat,
-                      self.goal,
-                      tuple(self.alligators),
-                      tuple(self.turtles),
-                      tuple(self.trees)
-                   ))
+        return hash(self.key)
 
 def isGoalState(boardState):
-    return boardState.boat.collision(boardState.goal)
+    context = boardState.context
+    return bool(context.boatTable.footprint[boardState.poses[0]] & context.goalMask)
 
 """
 This section provides helper functions to pass to search
@@ -508,7 +628,5 @@ def neighborGen(boardState):
     return boardState.getNeighbors()
 
 def costCalc(boardState):
-    if isGoalState(boardState):
-        return 0
-    return sum([boardState.radSrc.rads(point) for point in boardState.boat.space])
+    return boardState.context.radField.boatCost[boardState.poses[0]]
 
@@ -4,33 +4,90 @@ Michael Harrington
 This file exposes the game solver class that solves the puzzle
 """
 
+import json
+
 from util.timer import timeStampMuS
 from readPuzzleInput import getStateFromFile
 from gameRules import neighborGen, isGoalState, costCalc
 
+"""
+ImpossiblePuzzle stands in for a path solver when the puzzle analysis
+shows the goal can not be reached, so no search is run.
+"""
+class ImpossiblePuzzle():
+    pathFound = False
+    complete = True
+    stats = None
+
+    def __init__(self, reason):
+        self.reason = reason
+
 """
 GameSolver class handles extracting file input, searching, and printing
+
+Given a SolutionCache, solutions are looked up under solverName before
+searching and stored after, a hit's time is the time of the lookup.
+strTelemetry gives the solver's stats of the last solve as json,
+budgetExhausted marks a search cut short by a budget whether or not it
+found a path.
+Puzzles the analysis finds impossible fail at once, with the reason
+left in impossible.
 """
 class GameSolver():
-    def __init__(self, solverAlg):
+    def __init__(self, solverAlg, cache=None, solverName=None):
         self.solverAlg = solverAlg
+        self.cache = cache
+        self.solverName = solverName
 
     def runInputFile(self, inputFilePath):
         initialState = getStateFromFile(inputFilePath)
 
         startTime = timeStampMuS()
+        self.cached = False
+        self.context = initialState.context
+        self.impossible = initialState.context.analysis.impossible
+        if self.impossible is not None:
+            self.pathSolver = ImpossiblePuzzle(self.impossible)
+            self.totalTime = timeStampMuS() - startTime
+            return False
+        if self.cache is not None:
+            self.pathSolver = self.cache.get(initialState, self.solverName)
+            if self.pathSolver is not None:
+                self.cached = True
+                self.totalTime = timeStampMuS() - startTime
+                return True
         self.pathSolver = self.solverAlg(initialState, neighborGen, costCalc, isGoalState)
         endTime = timeStampMuS()
         self.totalTime = endTime - startTime
 
+        if self.cache is not None and self.pathSolver.pathFound:
+            self.cache.put(initialState, self.solverName, self.pathSolver)
         return self.pathSolver.pathFound
 
+    def strTelemetry(self):
+        pathSolver = self.pathSolver
+        telemetry = { 'solver': self.solverName,
+                      'totalTime': self.totalTime,
+                      'cached': self.cached,
+                      'impossible': self.impossible,
+                      'movePruning': self.context.movePruning,
+                      'pathFound': pathSolver.pathFound,
+                      'complete': pathSolver.complete,
+                      'budgetExhausted': not pathSolver.complete,
+                      'pathCost': pathSolver.pathCost if pathSolver.pathFound else None,
+                      'pathLength': len(pathSolver.actionPath) if pathSolver.pathFound else None,
+                      'stats': pathSolver.stats.toDict() if pathSolver.stats else None }
+        if getattr(pathSolver, 'incumbents', None) is not None:
+            telemetry['incumbents'] = pathSolver.incumbents
+        if getattr(pathSolver, 'heuristicCache', None) is not None:
+            telemetry['heuristicCache'] = { 'hits': pathSolver.heuristicCache.hits,
+                                            'misses': pathSolver.heuristicCache.misses }
+        return json.dumps(telemetry, indent=2, sort_keys=True)
+
     def strOutput(self):
-        path = self.pathSolver.actionPath
-        finalSearchState = self.pathSolver.searchNodePath[-1]
-        finalState = finalSearchState.boardState
+        finalState = self.pathSolver.finalState
         actions = self.pathSolver.actionPath
-        pathCost = 0 if finalSearchState is None else finalSearchState.parent.pathCost
+        pathCost = self.pathSolver.pathCost
 
         return '\n'.join(map(str, [ self.totalTime,
                                     pathCost,
@@ -6,7 +6,9 @@ This file provides heuristics for path finders
 
 from itertools import chain
 
-from game.gameRules import MapEntity, Moves
+from game.backwardSearch import BoatBackwardSearch
+from game.gameRules import Moves
+from game.patternDatabase import createPatternDatabases
 from game.util.cartMath import manhattanDistance, rayToPointList, Point, Cardinal
 
 def getBoatNeighbors(boardState):
@@ -21,6 +23,38 @@ def canBoatAdvance(boardState):
             return bool(boardState.applyAction(action))
     return False
 
+"""
+Boat pose tables
+
+Most parts of the heuristics below only depend on the boat's pose.
+poseParts is run once for the boat at every pose on the board, the
+returned parts are stored in one list per part indexed by pose.
+"""
+def createBoatPoseTables(context, poseParts):
+    boatFootprint = context.boatTable.footprint
+    tables = None
+    for pose, footprint in enumerate(boatFootprint):
+        if footprint is None:
+            continue
+        parts = poseParts(context.createObj(0, pose))
+        if tables is None:
+            tables = [[None] * len(boatFootprint) for part in parts]
+        for table, part in zip(tables, parts):
+            table[pose] = part
+    return tables
+
+"""
+Obstacle counting
+
+Obstacles are every solid cell except the boat. Each state carries an
+occupancy mask that getNeighbors derives from its parent's by only
+touching the moved object's cells, so counting the obstacles in a
+mask of cells does not depend on the number of objects on the board.
+"""
+def countObstacles(boardState, boatFootprint, cellsMask):
+    obstacles = boardState.occupancy & ~boatFootprint
+    return bin(cellsMask & obstacles).count('1')
+
 """
 We are just discovering what we can do with this heuristic
 """
@@ -30,20 +64,23 @@ def explorativeHeuristic(boardState):
         return 0
 
     # Lets make some helper values
+    context = boardState.context
+    bitBoard = context.bitBoard
+    boatFootprint = context.boatTable.footprint[boardState.poses[0]]
     boatPos = boardState.boat.cardRay.pos
     goalPos = boardState.goal.pos
     radPos = boardState.radSrc.pos
-    turtles = boardState.turtles
-    alligators = boardState.alligators
     boardPos = boardState.board.pos
     maxRadDist = max(boardPos.x - radPos.x, radPos.x) + max(boardPos.y - radPos.y, radPos.y)
 
     # If the goal is blocked we can't win
     goalBlocked = 0
-    if boardState.goal.collision(MapEntity(chain(*[t.space for t in turtles]))):
-        goalBlocked = 2
-    elif boardState.goal.collision(MapEntity(chain(*[a.space for a in alligators]))):
-        goalBlocked = 3
+    for slot, pose in enumerate(boardState.poses[1:], 1):
+        if context.moveTables[slot].footprint[pose] & context.goalMask:
+            if slot > context.numAlligators:
+                goalBlocked = 2
+                break
+            goalBlocked = 3
     # If we can't advance forward, can we at least turn?
     boatMobility = 0
     if not canBoatAdvance(boardState):
@@ -62,9 +99,7 @@ def explorativeHeuristic(boardState):
     for x in range(boatPos.x, goalPos.x + xOffset, xOffset):
         for y in range(boatPos.y, goalPos.y + yOffset, yOffset):
             goalTrack.add(Point(x, y))
-    obstacleObjs = boardState.alligators + boardState.turtles + boardState.trees
-    obstaclePoints = set(chain(*[obst.space for obst in obstacleObjs]))
-    obstacleCost = len(goalTrack.intersection(obstaclePoints))
+    obstacleCost = countObstacles(boardState, boatFootprint, bitBoard.pointsMask(goalTrack))
 
     # Goal is more important if you are closer to the goal
     goalWeight = (goalDistance + 5.0)/goalDistance
@@ -78,17 +113,14 @@ def explorativeHeuristic(boardState):
 This heuristic is for greedy searching
 """
 def createGreedyHeuristic(initialBoardState):
+    context = initialBoardState.context
     goalPos = initialBoardState.goal.pos
     boardPos = initialBoardState.board.pos
-    def greedyHeuristic(boardState):
-        # If goal is made, give it best priority!
-        if boardState.boat.collision(boardState.goal):
-            return 0
-    
+    def poseParts(boat):
         # Lets make some helper values
-        boatCardRay = boardState.boat.cardRay
+        boatCardRay = boat.cardRay
         boatPos = boatCardRay.pos
-        boatFrontPos = rayToPointList(boardState.boat.cardRay, boardState.boat.objLength)[-1]
+        boatFrontPos = rayToPointList(boat.cardRay, boat.objLength)[-1]
     
         # Obviously goal distance is important
         goalDist = min( manhattanDistance(boatPos, goalPos),
@@ -104,9 +136,6 @@ def createGreedyHeuristic(initialBoardState):
         for x in range(minX, maxX+1):
             for y in range(minY, maxY+1):
                 goalTrack.add(Point(x, y))
-        obstacleObjs = boardState.alligators + boardState.turtles + boardState.trees
-        obstaclePoints = set(chain(*[obst.space for obst in obstacleObjs]))
-        obstacleCost = len(goalTrack.intersection(obstaclePoints))
 
         if (maxX - minX) > (maxY - minY):
             orCostDict = { Cardinal.left:  0 if minX == goalPos.x else 4,
@@ -123,7 +152,19 @@ def createGreedyHeuristic(initialBoardState):
             
         orientationCost = orCostDict[boatCardRay.cardDir]
 
-        return goalDist + obstacleCost + orientationCost
+        return goalDist + orientationCost, context.bitBoard.pointsMask(goalTrack)
+
+    poseCost, trackMask = createBoatPoseTables(context, poseParts)
+    boatFootprint = context.boatTable.footprint
+    goalMask = context.goalMask
+    def greedyHeuristic(boardState):
+        # If goal is made, give it best priority!
+        pose = boardState.poses[0]
+        if boatFootprint[pose] & goalMask:
+            return 0
+
+        obstacleCost = countObstacles(boardState, boatFootprint[pose], trackMask[pose])
+        return poseCost[pose] + obstacleCost
 
     return greedyHeuristic
 
@@ -131,18 +172,16 @@ def createGreedyHeuristic(initialBoardState):
 Smart heuristic that gives a decent cost estimation even for A-Star searches
 """
 def createSmartHeuristic(initialBoardState):
+    context = initialBoardState.context
     goalPos = initialBoardState.goal.pos
     boardPos = initialBoardState.board.pos
-    def smartHeuristic(boardState):
-        # If goal is made, give it best priority!
-        if boardState.boat.collision(boardState.goal):
-            return 0
-    
+    radSrc = initialBoardState.radSrc
+    radField = context.radField
+    def poseParts(boat):
         # Lets make some helper values
-        boatCardRay = boardState.boat.cardRay
+        boatCardRay = boat.cardRay
         boatPos = boatCardRay.pos
-        boatFrontPos = rayToPointList(boardState.boat.cardRay, boardState.boat.objLength)[-1]
-        radSrc = boardState.radSrc
+        boatFrontPos = rayToPointList(boat.cardRay, boat.objLength)[-1]
     
         # Obviously goal distance is important
         goalDist = min( manhattanDistance(boatPos, goalPos),
@@ -158,9 +197,6 @@ def createSmartHeuristic(initialBoardState):
         for x in range(minX, maxX+1):
             for y in range(minY, maxY+1):
                 goalTrack.add(Point(x, y))
-        obstacleObjs = boardState.alligators + boardState.turtles + boardState.trees
-        obstaclePoints = set(chain(*[obst.space for obst in obstacleObjs]))
-        obstacleCost = len(goalTrack.intersection(obstaclePoints))
 
         orCostDict = { Cardinal.left:  0,
                        Cardinal.right: 0,
@@ -177,9 +213,21 @@ def createSmartHeuristic(initialBoardState):
             orCostDict[Cardinal.down] = 1
         orientationCost = orCostDict[boatCardRay.cardDir]
 
-        minRadCost = 2*min(radSrc.rads(p) for p in goalTrack) + radSrc.decayFactor
+        minRadCost = 2*min(radField.rads(p) for p in goalTrack) + radSrc.decayFactor
+
+        return goalDist + orientationCost, minRadCost, context.bitBoard.pointsMask(goalTrack)
+
+    poseCost, poseRadCost, trackMask = createBoatPoseTables(context, poseParts)
+    boatFootprint = context.boatTable.footprint
+    goalMask = context.goalMask
+    def smartHeuristic(boardState):
+        # If goal is made, give it best priority!
+        pose = boardState.poses[0]
+        if boatFootprint[pose] & goalMask:
+            return 0
 
-        return (goalDist + obstacleCost + orientationCost) * minRadCost
+        obstacleCost = countObstacles(boardState, boatFootprint[pose], trackMask[pose])
+        return (poseCost[pose] + obstacleCost) * poseRadCost[pose]
 
     return smartHeuristic
 
@@ -190,10 +238,7 @@ def createAdmissableHeuristic(initialBoardState):
     goalPos = initialBoardState.goal.pos
     boardPos = initialBoardState.board.pos
     radSrc = initialBoardState.radSrc
-    minRadCost = 2*min([radSrc.rads(Point(x, y)) 
-                        for x in range(boardPos.x)
-                            for y in range(boardPos.y)]
-                      ) + radSrc.decayFactor
+    minRadCost = 2*initialBoardState.context.radField.minRads + radSrc.decayFactor
     def admissableHeuristic(boardState):
         # If goal is made, give it best priority!
         if boardState.boat.collision(boardState.goal):
@@ -256,10 +301,7 @@ def createConsistentHeuristic(initialBoardState):
     goalPos = initialBoardState.goal.pos
     boardPos = initialBoardState.board.pos
     radSrc = initialBoardState.radSrc
-    minRadCost = 2*min([radSrc.rads(Point(x, y)) 
-                        for x in range(boardPos.x)
-                            for y in range(boardPos.y)]
-                      ) + radSrc.decayFactor
+    minRadCost = 2*initialBoardState.context.radField.minRads + radSrc.decayFactor
     def consistentHeuristic(boardState):
         # If goal is made, give it best priority!
         if boardState.boat.collision(boardState.goal):
@@ -294,4 +336,53 @@ def createConsistentHeuristic(initialBoardState):
 
         return goalDist * minRadCost
 
+    consistentHeuristic.integerValued = True
+    consistentHeuristic.consistent = True
     return consistentHeuristic
+
+"""
+Boat distance map
+
+Relaxed problem where only the boat moves, trees are walls and
+animals are ignored. The backward boat search from the goal poses
+gives, for every boat pose, the cheapest radiation cost of reaching
+the goal. Unreachable poses are left at infinity.
+Any real path contains a relaxed path of boat moves and animal moves
+never cost less than nothing, so the map is a lower bound. It is also
+consistent, since a boat move changes it by at most the move cost and
+an animal move does not change it at all.
+"""
+def createBoatDistanceMap(context):
+    return BoatBackwardSearch(context).distMap
+
+def createBoatDistanceHeuristic(initialBoardState):
+    distMap = createBoatDistanceMap(initialBoardState.context)
+    def boatDistanceHeuristic(boardState):
+        return distMap[boardState.poses[0]]
+
+    boatDistanceHeuristic.integerValued = True
+    boatDistanceHeuristic.consistent = True
+    return boatDistanceHeuristic
+
+"""
+Pattern database heuristic
+
+Takes the max of the boat distance map and the pattern databases
+over the boat and the animals most in the way of its corridor.
+Databases are cached in cacheDir when given.
+"""
+def createPatternDatabaseHeuristic(initialBoardState, cacheDir='pdbs'):
+    distMap = createBoatDistanceMap(initialBoardState.context)
+    pdbs = createPatternDatabases(initialBoardState, distMap, cacheDir)
+    def patternDatabaseHeuristic(boardState):
+        poses = boardState.poses
+        cost = distMap[poses[0]]
+        for pdb in pdbs:
+            pdbCost = pdb.lookup(poses)
+            if pdbCost > cost:
+                cost = pdbCost
+        return cost
+
+    patternDatabaseHeuristic.integerValued = True
+    patternDatabaseHeuristic.consistent = True
+    return patternDatabaseHeuristic
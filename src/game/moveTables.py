@@ -0,0 +1,69 @@
+"""
+Michael Harrington
+
+This file provides move tables. On a fixed board, every pose of a
+movable object and every action it takes has a fixed result, so the
+results are computed once per puzzle and looked up during search.
+"""
+
+from copy import copy
+
+from util.cartMath import Cardinal, CardinalRay
+
+"""
+Poses pack a bitboard cell and a cardinal direction into one integer,
+pose = cell * 4 + cardDir, so the direction is always pose & 3.
+"""
+def poseIndex(bitBoard, cardRay):
+    return bitBoard.cellIndex(cardRay.x, cardRay.y) * 4 + cardRay.cardDir
+
+def poseRay(bitBoard, pose):
+    y, x = divmod(pose >> 2, bitBoard.stride)
+    return CardinalRay(x - 1, y - 1, pose & 3)
+
+"""
+MoveTable holds the moves of one kind of movable object.
+For every pose on the board:
+    footprint[pose]    :: cell mask covered by the object
+    moves[pose]        :: [(act, resultPose, requiredMask, resultFootprint)]
+    reverseMoves[pose] :: [(act, prevPose, requiredMask)] moves ending in pose
+requiredMask holds every cell the move sweeps through or lands on,
+these must be clear of any other solid object. Moves leaving the board
+are left out, poses off the board are None.
+"""
+class MoveTable():
+    def __init__(self, bitBoard, objClass):
+        numPoses = bitBoard.stride * (bitBoard.height + 2) * 4
+        self.footprint = [None] * numPoses
+        self.moves = [None] * numPoses
+        self.reverseMoves = [None] * numPoses
+
+        objs = []
+        for x in range(bitBoard.width):
+            for y in range(bitBoard.height):
+                for cardDir in (Cardinal.down, Cardinal.up, Cardinal.left, Cardinal.right):
+                    obj = objClass(CardinalRay(x, y, cardDir), 0)
+                    if bitBoard.pointsOnBoard(obj.space):
+                        self.footprint[poseIndex(bitBoard, obj.cardRay)] = bitBoard.pointsMask(obj.space)
+                        objs.append(obj)
+
+        for obj in objs:
+            moves = []
+            for action in obj.actions:
+                movedObj = copy(obj)
+                requiredMask = bitBoard.pointsMask(movedObj.move(action).space)
+                if not bitBoard.contains(requiredMask):
+                    continue
+                resultPose = poseIndex(bitBoard, movedObj.cardRay)
+                moves.append((action.act, resultPose, requiredMask, self.footprint[resultPose]))
+            self.moves[poseIndex(bitBoard, obj.cardRay)] = tuple(moves)
+
+        for pose, moves in enumerate(self.moves):
+            if moves is None:
+                continue
+            if self.reverseMoves[pose] is None:
+                self.reverseMoves[pose] = []
+            for act, resultPose, requiredMask, resultFootprint in moves:
+                if self.reverseMoves[resultPose] is None:
+                    self.reverseMoves[resultPose] = []
+                self.reverseMoves[resultPose].append((act, pose, requiredMask))
@@ -0,0 +1,205 @@
+"""
+Michael Harrington
+
+This file provides pattern databases. A pattern keeps the boat and a
+few chosen animals of a puzzle and removes every other animal. The
+exact radiation cost to the goal of every state of the pattern is
+found with a reverse Dijkstra and stored in a compact array.
+
+Removing animals only removes obstacles, so every real path maps to a
+pattern path that costs no more. Pattern costs are therefore a
+consistent lower bound, and so is the max over several patterns.
+Patterns share the boat's costs, so adding them would not be.
+
+Databases are saved to disk under a hash of everything they depend
+on and are memory mapped when a later solve asks for the same one.
+"""
+
+from array import array
+from itertools import product
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+
+pdbVersion = 1
+unreachable = -1
+# Animals kept by each pattern, and how many animals are worth keeping
+patternSize = 2
+maxPatternAnimals = 4
+
+def reachablePoses(context, slot, initialPose):
+    # Poses an animal can slide to when only trees stand in its way
+    table = context.moveTables[slot]
+    poses = [initialPose]
+    seen = set(poses)
+    for pose in poses:
+        for act, resultPose, requiredMask, resultFootprint in table.moves[pose]:
+            if resultPose not in seen and not requiredMask & context.treeMask:
+                seen.add(resultPose)
+                poses.append(resultPose)
+    return sorted(poses)
+
+def boatCorridorMask(context, distMap, boatPose):
+    # Cells swept by the boat following the distance map from boatPose to the goal
+    boatTable = context.boatTable
+    boatCost = context.radField.boatCost
+    corridor = boatTable.footprint[boatPose]
+    while distMap[boatPose] not in (0, float('inf')):
+        for act, resultPose, requiredMask, resultFootprint in boatTable.moves[boatPose]:
+            if not requiredMask & context.treeMask and \
+               boatCost[resultPose] + distMap[resultPose] == distMap[boatPose]:
+                corridor |= requiredMask
+                boatPose = resultPose
+                break
+        else:
+            break
+    return corridor
+
+def chooseAnimalSlots(initialBoardState, distMap):
+    # Animals ranked by how much of the boat's relaxed corridor they can cover
+    context = initialBoardState.context
+    poses = initialBoardState.poses
+    corridor = boatCorridorMask(context, distMap, poses[0])
+    overlaps = []
+    for slot in range(1, len(poses)):
+        reach = 0
+        for pose in reachablePoses(context, slot, poses[slot]):
+            reach |= context.moveTables[slot].footprint[pose]
+        overlap = bin(reach & corridor).count('1')
+        if overlap:
+            overlaps.append((-overlap, slot))
+    return [slot for overlap, slot in sorted(overlaps)[:maxPatternAnimals]]
+
+def createPatternDatabases(initialBoardState, distMap, cacheDir=None):
+    slots = chooseAnimalSlots(initialBoardState, distMap)
+    return [ PatternDatabase(initialBoardState, slots[i:i+patternSize], cacheDir)
+             for i in range(0, len(slots), patternSize) ]
+
+"""
+PatternDatabase indexes a pattern state by the compact index of each
+kept object's pose: index = sum(poseIndex[k][pose_k] * stride[k]), with
+the boat as component 0. The table holds the cost to the goal of each
+index, or unreachable.
+"""
+class PatternDatabase():
+    def __init__(self, initialBoardState, slots, cacheDir=None):
+        context = initialBoardState.context
+        self.slots = [0] + list(slots)
+        boatPoses = [ pose for pose, footprint in enumerate(context.boatTable.footprint)
+                      if footprint is not None and not footprint & context.treeMask ]
+        self.poses = [boatPoses] + [ reachablePoses(context, slot, initialBoardState.poses[slot])
+                                     for slot in slots ]
+        self.poseIndex = [dict((pose, i) for i, pose in enumerate(poses)) for poses in self.poses]
+        self.strides = []
+        size = 1
+        for poses in reversed(self.poses):
+            self.strides.insert(0, size)
+            size *= len(poses)
+        self.size = size
+        self.components = list(zip(self.slots, self.poseIndex, self.strides))
+
+        path = None
+        if cacheDir is not None:
+            path = os.path.join(cacheDir, self.puzzleHash(initialBoardState) + '.pdb')
+        self.table = None
+        if path is not None and os.path.exists(path):
+            self.table = MappedTable.load(path, size)
+        if self.table is None:
+            self.table = self.build(context)
+            if path is not None:
+                self.save(path)
+
+    def puzzleHash(self, initialBoardState):
+        context = initialBoardState.context
+        radSrc = context.radSrc
+        kept = [ (context.slotObjs[slot][0].__name__, initialBoardState.poses[slot])
+                 for slot in self.slots[1:] ]
+        description = repr(( pdbVersion,
+                             context.board.pos.x, context.board.pos.y,
+                             radSrc.pos.x, radSrc.pos.y, radSrc.magnitude, radSrc.decayFactor,
+                             context.goal.pos.x, context.goal.pos.y,
+                             sorted((t.pos.x, t.pos.y) for t in context.trees),
+                             kept ))
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+    def lookup(self, poses):
+        index = 0
+        for slot, poseIndex, stride in self.components:
+            index += poseIndex[poses[slot]] * stride
+        cost = self.table[index]
+        if cost == unreachable:
+            return float('inf')
+        return cost
+
+    def build(self, context):
+        boatTable = context.boatTable
+        boatCost = context.radField.boatCost
+        # Reverse edges, predecessors[index] holds (prevIndex, moveCost)
+        predecessors = {}
+        goals = []
+        for poses in product(*self.poses):
+            footprints = [context.moveTables[slot].footprint[pose] for slot, pose in zip(self.slots, poses)]
+            occupancy = context.treeMask
+            for footprint in footprints:
+                if occupancy & footprint:
+                    break
+                occupancy |= footprint
+            else:
+                index = sum(i[pose] * stride for pose, i, stride in zip(poses, self.poseIndex, self.strides))
+                if footprints[0] & context.goalMask:
+                    goals.append(index)
+                    continue
+                for k, (slot, poseIndex, stride) in enumerate(self.components):
+                    obstacles = occupancy & ~footprints[k]
+                    for act, resultPose, requiredMask, resultFootprint in context.moveTables[slot].moves[poses[k]]:
+                        if requiredMask & obstacles:
+                            continue
+                        newIndex = index + (poseIndex[resultPose] - poseIndex[poses[k]]) * stride
+                        moveCost = boatCost[resultPose] if slot == 0 else boatCost[poses[0]]
+                        predecessors.setdefault(newIndex, []).append((index, moveCost))
+
+        table = array('i', [unreachable]) * self.size
+        frontier = [(0, index) for index in goals]
+        for index in goals:
+            table[index] = 0
+        while frontier:
+            dist, index = heapq.heappop(frontier)
+            if dist > table[index]:
+                continue
+            for prevIndex, moveCost in predecessors.get(index, ()):
+                newDist = dist + moveCost
+                if table[prevIndex] == unreachable or newDist < table[prevIndex]:
+                    table[prevIndex] = newDist
+                    heapq.heappush(frontier, (newDist, prevIndex))
+        return table
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmpPath = path + '.tmp'
+        with open(tmpPath, 'wb') as fileObj:
+            self.table.tofile(fileObj)
+        os.rename(tmpPath, path)
+
+"""
+MappedTable reads the entries of a saved table straight from a
+memory mapped file.
+"""
+class MappedTable():
+    entry = struct.Struct('=i')
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+
+    @classmethod
+    def load(cls, path, size):
+        with open(path, 'rb') as fileObj:
+            if os.fstat(fileObj.fileno()).st_size != size * cls.entry.size:
+                return None
+            return cls(mmap.mmap(fileObj.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __getitem__(self, index):
+        return self.entry.unpack_from(self.mapped, index * self.entry.size)[0]
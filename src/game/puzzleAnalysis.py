@@ -0,0 +1,174 @@
+"""
+Michael Harrington
+
+This file provides the static analysis run on a puzzle before search.
+Trees never move and animals only slide along their axis, so where an
+animal can ever be is known at load time.
+
+An animal's core is the set of cells it covers at every pose it can
+reach, those cells are walls for everything else. Reachable poses are
+found with the trees and the cores of the other animals as walls and
+the two are refined together until they settle. Both stay sound: the
+poses found are never fewer than the truly reachable ones, so the
+cores are never more than the truly always covered cells.
+
+An animal is relevant when it can cover a cell the boat or another
+relevant animal may have to move through. Irrelevant animals never
+change whether a relevant move is legal, and moving one only costs
+radiation, so they are frozen without losing any optimal path. Moves
+blocked by walls can never be made and are left out as well.
+
+The same test can be run per state with the boat's sweep from its
+current pose in place of its sweep from the start, keeping to poses the
+goal can still be reached from. What the boat can still sweep only
+shrinks as it moves, so an animal irrelevant in a
+state stays irrelevant in every state after it. Dropping its moves
+from an optimal path leaves a legal path of no greater cost that only
+uses moves kept at each of its states, which makes the pruning safe
+for optimal search.
+"""
+
+"""
+PuzzleAnalysis
+
+For every slot:
+    reachable[slot] :: poses the object can reach past the walls
+    core[slot]      :: cells covered at every reachable pose
+    sweep[slot]     :: cells its possible moves sweep through
+    slotMoves[slot] :: moves[pose] left after pruning, used by search
+relevant holds the animal slots that are not frozen. impossible is a
+reason the boat can never reach the goal, or None. relevantSlots(pose)
+gives the slots whose moves matter while the boat is at pose.
+"""
+class PuzzleAnalysis():
+    def __init__(self, context, poses):
+        self.context = context
+        numSlots = len(poses)
+        self.core = [0] * numSlots
+        self.reachable = [None] * numSlots
+        while True:
+            for slot in range(1, numSlots):
+                self.reachable[slot] = self.reachablePoses(slot, poses[slot], self.walls(slot))
+            cores = [0] + [self._coreMask(slot) for slot in range(1, numSlots)]
+            if cores == self.core:
+                break
+            self.core = cores
+        self.reachable[0] = self.reachablePoses(0, poses[0], self.walls(0))
+        self.sweep = [self._sweepMask(slot) for slot in range(numSlots)]
+
+        self.impossible = None
+        boatTable = context.boatTable
+        if not any(boatTable.footprint[pose] & context.goalMask for pose in self.reachable[0]):
+            self.impossible = 'the boat can not reach the goal past trees and stuck animals'
+
+        self.reach = [self._reachMask(slot) for slot in range(numSlots)]
+        self.relevant = self.relevantTo(self.sweep[0])
+        # Memos of the per boat pose sweeps and relevant slots
+        self.boatWalls = self.walls(0)
+        self.goalPoses = self._goalPoses()
+        self.boatSweeps = {}
+        self.poseSlots = {}
+
+        frozenMoves = [()] * len(boatTable.footprint)
+        self.slotMoves = []
+        for slot in range(numSlots):
+            if slot == 0 or slot in self.relevant:
+                self.slotMoves.append(self._prunedMoves(slot))
+            else:
+                self.slotMoves.append(frozenMoves)
+
+    def relevantTo(self, needed):
+        # Animals that can cover cells in needed or needed by another relevant animal
+        relevant = set()
+        changed = True
+        while changed:
+            changed = False
+            for slot in range(1, len(self.reach)):
+                if slot not in relevant and self.reach[slot] & needed:
+                    relevant.add(slot)
+                    needed |= self.sweep[slot]
+                    changed = True
+        return relevant
+
+    def boatSweep(self, boatPose):
+        # Cells the boat can sweep from boatPose, found by flood fill
+        sweep = self.boatSweeps.get(boatPose)
+        if sweep is None:
+            boatTable = self.context.boatTable
+            sweep = 0
+            for pose in self.reachablePoses(0, boatPose, self.boatWalls):
+                if pose not in self.goalPoses:
+                    continue
+                sweep |= boatTable.footprint[pose]
+                for act, resultPose, requiredMask, resultFootprint in boatTable.moves[pose]:
+                    if resultPose in self.goalPoses and not requiredMask & self.boatWalls:
+                        sweep |= requiredMask
+            self.boatSweeps[boatPose] = sweep
+        return sweep
+
+    def _goalPoses(self):
+        # Boat poses the goal can still be reached from, a path to the goal never leaves them
+        boatTable = self.context.boatTable
+        poses = [ pose for pose, footprint in enumerate(boatTable.footprint)
+                  if footprint is not None and footprint & self.context.goalMask ]
+        seen = set(poses)
+        for pose in poses:
+            for act, prevPose, requiredMask in boatTable.reverseMoves[pose]:
+                if prevPose not in seen and not requiredMask & self.boatWalls:
+                    seen.add(prevPose)
+                    poses.append(prevPose)
+        return seen
+
+    def relevantSlots(self, boatPose):
+        slots = self.poseSlots.get(boatPose)
+        if slots is None:
+            slots = tuple([0] + sorted(self.relevantTo(self.boatSweep(boatPose))))
+            self.poseSlots[boatPose] = slots
+        return slots
+
+    def walls(self, slot):
+        walls = self.context.treeMask
+        for other, core in enumerate(self.core):
+            if other != slot:
+                walls |= core
+        return walls
+
+    def reachablePoses(self, slot, initialPose, walls):
+        table = self.context.moveTables[slot]
+        poses = [initialPose]
+        seen = set(poses)
+        for pose in poses:
+            for act, resultPose, requiredMask, resultFootprint in table.moves[pose]:
+                if resultPose not in seen and not requiredMask & walls:
+                    seen.add(resultPose)
+                    poses.append(resultPose)
+        return sorted(poses)
+
+    def _coreMask(self, slot):
+        footprint = self.context.moveTables[slot].footprint
+        core = -1
+        for pose in self.reachable[slot]:
+            core &= footprint[pose]
+        return core
+
+    def _reachMask(self, slot):
+        footprint = self.context.moveTables[slot].footprint
+        reach = 0
+        for pose in self.reachable[slot]:
+            reach |= footprint[pose]
+        return reach
+
+    def _sweepMask(self, slot):
+        table = self.context.moveTables[slot]
+        walls = self.walls(slot)
+        sweep = self._reachMask(slot)
+        for pose in self.reachable[slot]:
+            for act, resultPose, requiredMask, resultFootprint in table.moves[pose]:
+                if not requiredMask & walls:
+                    sweep |= requiredMask
+        return sweep
+
+    def _prunedMoves(self, slot):
+        walls = self.walls(slot)
+        return [ moves if moves is None else tuple(move for move in moves if not move[2] & walls)
+                 for moves in self.context.moveTables[slot].moves ]
@@ -0,0 +1,49 @@
+"""
+Michael Harrington
+
+This file provides the radiation field of a puzzle. The radiation
+source never moves, so the radiation of every cell and the cost of
+every boat pose are computed once per puzzle and looked up during
+search.
+"""
+
+from util.cartMath import Point
+
+"""
+RadField stores rads in flat lists indexed like the bitboard:
+    cellRads[cell]     :: rads of an on-board cell, None off the board
+    boatCost[pose]     :: cost of the boat ending a move in pose
+    minRads            :: lowest rads of any cell on the board
+Ending a move on the goal costs nothing, so boat poses covering the
+goal cost 0.
+"""
+class RadField():
+    def __init__(self, radSrc, bitBoard, boatTable, goalMask):
+        self.bitBoard = bitBoard
+        self.cellRads = [None] * (bitBoard.stride * (bitBoard.height + 2))
+        for x in range(bitBoard.width):
+            for y in range(bitBoard.height):
+                self.cellRads[bitBoard.cellIndex(x, y)] = radSrc.rads(Point(x, y))
+        self.minRads = min(rads for rads in self.cellRads if rads is not None)
+
+        self.boatCost = [None] * len(boatTable.footprint)
+        for pose, footprint in enumerate(boatTable.footprint):
+            if footprint is None:
+                continue
+            if footprint & goalMask:
+                self.boatCost[pose] = 0
+            else:
+                self.boatCost[pose] = self.maskRads(footprint)
+
+    def rads(self, point):
+        return self.cellRads[self.bitBoard.cellIndex(point.x, point.y)]
+
+    def maskRads(self, mask):
+        total = 0
+        cell = 0
+        while mask:
+            if mask & 1:
+                total += self.cellRads[cell]
+            mask >>= 1
+            cell += 1
+        return total
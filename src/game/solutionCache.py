@@ -0,0 +1,126 @@
+"""
+Michael Harrington
+
+This file provides an on disk cache of solutions. Entries are keyed by
+a hash of the parsed puzzle together with the name of the solver that
+solved it, so the same puzzle written out differently still hits.
+"""
+
+import hashlib
+import json
+import os
+
+from gameRules import isGoalState, costCalc
+
+cacheVersion = 2
+
+def puzzleHash(initialBoardState):
+    # Trees are unordered, animals keep their order since actions refer to their index
+    context = initialBoardState.context
+    radSrc = context.radSrc
+    description = repr(( cacheVersion,
+                         context.board.pos.x, context.board.pos.y,
+                         radSrc.pos.x, radSrc.pos.y, radSrc.magnitude, radSrc.decayFactor,
+                         context.goal.pos.x, context.goal.pos.y,
+                         sorted((t.pos.x, t.pos.y) for t in context.trees),
+                         context.numAlligators, context.numTurtles,
+                         list(initialBoardState.poses) ))
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+"""
+CachedSolution stands in for a path solver on a cache hit, holding
+what GameSolver.strOutput prints.
+"""
+class CachedSolution():
+    pathFound = True
+    complete = True
+    stats = None
+
+    def __init__(self, entry):
+        self.pathCost = entry['pathCost']
+        self.actionPath = entry['actions']
+        self.finalState = entry['finalState']
+
+"""
+SolutionCache keeps one json file per entry in cacheDir. Hits refresh
+the file's modification time, and once there are more than maxEntries
+files the least recently used ones are evicted. Solutions of searches
+cut short by a budget are not stored. With verify set a hit is
+replayed through applyAction first, and an entry whose moves are not
+legal, do not reach the goal or do not add up to its cost is dropped
+instead of returned.
+"""
+class SolutionCache():
+    def __init__(self, cacheDir='solutioncache', maxEntries=1000, verify=False):
+        self.cacheDir = cacheDir
+        self.maxEntries = maxEntries
+        self.verify = verify
+
+    def entryPath(self, initialBoardState, solverName):
+        key = hashlib.sha1((puzzleHash(initialBoardState) + solverName).encode('utf-8')).hexdigest()
+        return os.path.join(self.cacheDir, key + '.json')
+
+    def get(self, initialBoardState, solverName):
+        path = self.entryPath(initialBoardState, solverName)
+        try:
+            with open(path) as fileObj:
+                entry = json.load(fileObj)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        if self.verify and not self.replay(initialBoardState, entry):
+            self._remove(path)
+            return None
+        return CachedSolution(entry)
+
+    def put(self, initialBoardState, solverName, pathSolver):
+        # Paths of searches cut short could be beaten by a full search
+        if not pathSolver.complete:
+            return
+        context = initialBoardState.context
+        actions = pathSolver.actionPath
+        entry = { 'pathCost': pathSolver.pathCost,
+                  'actions': [str(action) for action in actions],
+                  'moves': [(context.actionSlot(action), action.act) for action in actions],
+                  'finalState': str(pathSolver.finalState) }
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        path = self.entryPath(initialBoardState, solverName)
+        tmpPath = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmpPath, 'w') as fileObj:
+            json.dump(entry, fileObj)
+        os.rename(tmpPath, path)
+        self.evict()
+
+    def replay(self, initialBoardState, entry):
+        context = initialBoardState.context
+        boardState = initialBoardState
+        pathCost = 0
+        for slot, act in entry['moves']:
+            action = context.slotActions[slot][(boardState.poses[slot] & 3) * 4 + act]
+            boardState = boardState.applyAction(action)
+            if boardState is None:
+                return False
+            pathCost += costCalc(boardState)
+        return isGoalState(boardState) and pathCost == entry['pathCost']
+
+    def evict(self):
+        paths = [ os.path.join(self.cacheDir, name) for name in os.listdir(self.cacheDir)
+                  if name.endswith('.json') ]
+        if len(paths) <= self.maxEntries:
+            return
+        ages = []
+        for path in paths:
+            try:
+                ages.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        for mtime, path in sorted(ages)[:len(ages) - self.maxEntries]:
+            self._remove(path)
+
+    def _remove(self, path):
+        # Another process may have evicted it already
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,38 @@
+"""
+Michael Harrington
+
+This file provides a bitboard abstraction where a set of cells
+is represented by the bits of a single integer
+"""
+
+class BitBoard():
+    # The grid is padded by one cell on every side so that a move
+    # stepping just off the board still maps to a bit. Those padding
+    # bits are never part of the inBounds mask.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.inBounds = 0
+        for x in range(width):
+            for y in range(height):
+                self.inBounds |= self.cellBit(x, y)
+        self.outOfBounds = ((1 << (self.stride * (height + 2))) - 1) & ~self.inBounds
+
+    def cellIndex(self, x, y):
+        return (y + 1) * self.stride + (x + 1)
+
+    def cellBit(self, x, y):
+        return 1 << self.cellIndex(x, y)
+
+    def pointsMask(self, points):
+        mask = 0
+        for point in points:
+            mask |= 1 << ((point.y + 1) * self.stride + (point.x + 1))
+        return mask
+
+    def pointsOnBoard(self, points):
+        return all(0 <= p.x < self.width and 0 <= p.y < self.height for p in points)
+
+    def contains(self, mask):
+        return not (mask & self.outOfBounds)
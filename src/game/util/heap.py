@@ -1,61 +1,377 @@
 """
 Michael Harrington
 
-This file implements a Heap which is a wrapper over heapq
+This file implements priority queues for path finder frontiers,
+a Heap which is a wrapper over heapq, an IndexedHeap and a BucketQueue
 """
 
-from collections import defaultdict
+from collections import deque
+from itertools import count
+from random import Random
 import heapq
-from random import randint
-
-# We want to return this HeapNode class because we use the
-# registry as a class variable but it needs to be specific
-# to a Heap instance
-def getHeapNodeClass():
-    class HeapNode():
-        elCounts = defaultdict(int)
-        registry = defaultdict(list)
-
-        @classmethod
-        def create(cls, el, val):
-            orVal = cls.elCounts[el]
-            # This tuple is used for ordering, el will never be compared
-            # The second tuple item is used to randomly prioritize earlier els when tied
-            # The third tuple item ensures that el will not need to be compared
-            heapNode = (val, randint(orVal/2, orVal), orVal, el)
-            cls.elCounts[el] += 1
-            cls.registry[el].append(heapNode)
-            return heapNode
-
-    return HeapNode
 
+"""
+Tie breaking policies
+
+Entries with equal values are ordered by a tie value computed from
+the push order and the path cost g of the pushed element, and then by
+push order. None of the deterministic policies draw random numbers.
+"""
+def fifoTieBreak(order, g):
+    return 0
+
+def lifoTieBreak(order, g):
+    return -order
+
+def highGTieBreak(order, g):
+    return -g
+
+def createRandomTieBreak(seed=None):
+    rng = Random(seed)
+    def randomTieBreak(order, g):
+        return rng.random()
+    return randomTieBreak
+
+"""
+Lazy deletion heap
+
+Holds at most one live entry per key. Replacing the entry of a key
+leaves the old entry in the heap as stale, stale entries are dropped
+when they reach the top. The registry only tracks live entries and the
+heap is compacted once stale entries outnumber live ones, so memory
+follows the frontier size rather than the total number of pushes.
+"""
 class Heap():
-    def __init__(self):
+    def __init__(self, tieBreak=fifoTieBreak):
+        # Entries are (val, tie, order, key, el), order is unique which
+        # ensures key and el will never be compared
         self.heap = []
-        self.HeapNode = getHeapNodeClass()
-
-    def push(self, el, val):
-        newHeapNode = self.HeapNode.create(el, val)
-        heapq.heappush(self.heap, newHeapNode)
-
-    def uniquePush(self, el, val):
-        if el in self.HeapNode.registry:
-            if val < self.HeapNode.registry[el][0][0]:
-                self.heap.remove(self.HeapNode.registry[el][0])
-                self.HeapNode.registry[el] = []
-                self.HeapNode.elCounts[el] = 0
-                
-            else:
+        self.registry = {}
+        self.order = count()
+        self.tieBreak = tieBreak
+        self.staleCount = 0
+
+    def push(self, el, val, key=None, g=0):
+        if key is None:
+            key = el
+        replaced = key in self.registry
+        order = next(self.order)
+        entry = (val, self.tieBreak(order, g), order, key, el)
+        self.registry[key] = entry
+        heapq.heappush(self.heap, entry)
+        if replaced:
+            self._markStale()
+
+    def uniquePush(self, el, val, key=None, g=0):
+        if key is None:
+            key = el
+        if key in self.registry and not val < self.registry[key][0]:
+            # El is present with lower val
+            return
+        self.push(el, val, key, g)
+
+    def pop(self):
+        while True:
+            entry = heapq.heappop(self.heap)
+            key = entry[3]
+            if self.registry.get(key) is entry:
+                del self.registry[key]
+                if not self.registry:
+                    # Anything left is stale
+                    self.heap = []
+                    self.staleCount = 0
+                return entry[4]
+            self.staleCount -= 1
+
+    def peek(self):
+        # The element pop would return next, stale entries on top are dropped
+        while self.registry.get(self.heap[0][3]) is not self.heap[0]:
+            heapq.heappop(self.heap)
+            self.staleCount -= 1
+        return self.heap[0][4]
+
+    def remove(self, key):
+        if key in self.registry:
+            del self.registry[key]
+            self._markStale()
+
+    def _markStale(self):
+        self.staleCount += 1
+        if self.staleCount > len(self.registry):
+            self.heap = list(self.registry.values())
+            heapq.heapify(self.heap)
+            self.staleCount = 0
+
+    def __contains__(self, key):
+        return key in self.registry
+
+    def __len__(self):
+        return len(self.registry)
+
+    def __nonzero__(self):
+        return len(self.registry) != 0
+
+"""
+Indexed binary heap
+
+Holds at most one entry per key and keeps a key -> position index,
+so a cheaper value for a key already in the heap is a true O(log n)
+decrease-key instead of a removal and re-heap.
+"""
+class IndexedHeap():
+    def __init__(self, tieBreak=fifoTieBreak):
+        # Entries are [val, tie, order, key, el], order is unique which
+        # ensures key and el will never be compared
+        self.heap = []
+        self.index = {}
+        self.order = count()
+        self.tieBreak = tieBreak
+
+    def uniquePush(self, el, val, key=None, g=0):
+        if key is None:
+            key = el
+        order = next(self.order)
+        if key in self.index:
+            pos = self.index[key]
+            entry = self.heap[pos]
+            if not val < entry[0]:
                 # El is present with lower val
                 return
-        self.push(el, val)
+            entry[0] = val
+            entry[1] = self.tieBreak(order, g)
+            entry[2] = order
+            entry[4] = el
+            self._siftUp(pos)
+        else:
+            self.heap.append([val, self.tieBreak(order, g), order, key, el])
+            self._siftUp(len(self.heap) - 1)
 
     def pop(self):
-        return heapq.heappop(self.heap)[-1]
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        if heap:
+            heap[0] = last
+            self._siftDown(0)
+        del self.index[top[3]]
+        return top[4]
+
+    def get(self, key, default=None):
+        if key in self.index:
+            return self.heap[self.index[key]][4]
+        return default
+
+    def minValue(self):
+        return self.heap[0][0]
+
+    def elements(self):
+        return [entry[4] for entry in self.heap]
+
+    def _siftUp(self, pos):
+        heap = self.heap
+        index = self.index
+        entry = heap[pos]
+        while pos > 0:
+            parentPos = (pos - 1) >> 1
+            parent = heap[parentPos]
+            if not entry < parent:
+                break
+            heap[pos] = parent
+            index[parent[3]] = pos
+            pos = parentPos
+        heap[pos] = entry
+        index[entry[3]] = pos
+
+    def _siftDown(self, pos):
+        heap = self.heap
+        index = self.index
+        size = len(heap)
+        entry = heap[pos]
+        childPos = 2*pos + 1
+        while childPos < size:
+            rightPos = childPos + 1
+            if rightPos < size and heap[rightPos] < heap[childPos]:
+                childPos = rightPos
+            child = heap[childPos]
+            if not child < entry:
+                break
+            heap[pos] = child
+            index[child[3]] = pos
+            pos = childPos
+            childPos = 2*pos + 1
+        heap[pos] = entry
+        index[entry[3]] = pos
+
+    def __contains__(self, key):
+        return key in self.index
 
-    def __contains__(self, el):
-        return el in self.HeapNode.registry
+    def __len__(self):
+        return len(self.heap)
 
     def __nonzero__(self):
         return len(self.heap) != 0
 
+"""
+Bucket queue
+
+Monotone priority queue for integer values, as in Dial's algorithm.
+Bucket i holds the entries of value base + i and a cursor marks the
+lowest bucket that may hold entries. Until the first pop or minValue
+values may come in any order, after that the cursor only moves forward
+and a push below the value at the cursor raises ValueError. That makes
+it a frontier for values that never decrease, such as A* f-values under
+a consistent heuristic with integer step costs. A push is O(1) amortised
+and pops are O(1) amortised plus one step per empty value skipped.
+Buckets are FIFO or LIFO queues under those tie breaks, under other tie
+breaks each bucket is a heap on the tie value and adds O(log b) for a
+bucket of b entries. Infinite values share one bucket served after all
+the others. Holds at most one live entry per key, a replaced entry is
+left stale and dropped when reached, buckets are rebuilt once stale
+entries outnumber live ones. It provides the methods of both Heap and
+IndexedHeap that solvers use.
+"""
+class BucketQueue():
+    def __init__(self, tieBreak=fifoTieBreak):
+        # Entries are [val, tie, order, key, el]
+        self.tieBreak = tieBreak
+        self.buckets = []
+        self.base = None
+        self.cursor = 0
+        self.started = False
+        self.infinite = None
+        self.registry = {}
+        self.order = count()
+        self.staleCount = 0
+
+    def push(self, el, val, key=None, g=0):
+        if key is None:
+            key = el
+        replaced = key in self.registry
+        order = next(self.order)
+        entry = [val, self.tieBreak(order, g), order, key, el]
+        self._append(entry)
+        self.registry[key] = entry
+        if replaced:
+            self.staleCount += 1
+            if self.staleCount > len(self.registry):
+                self._rebuild()
+
+    def uniquePush(self, el, val, key=None, g=0):
+        if key is None:
+            key = el
+        if key in self.registry and not val < self.registry[key][0]:
+            # El is present with lower val
+            return
+        self.push(el, val, key, g)
+
+    def pop(self):
+        entry = self._top()
+        self._popTop()
+        del self.registry[entry[3]]
+        if not self.registry:
+            # Anything left is stale
+            self.buckets = []
+            self.base = None
+            self.cursor = 0
+            self.started = False
+            self.infinite = None
+            self.staleCount = 0
+        return entry[4]
+
+    def minValue(self):
+        return self._top()[0]
+
+    def get(self, key, default=None):
+        if key in self.registry:
+            return self.registry[key][4]
+        return default
+
+    def _append(self, entry):
+        if entry[0] == float('inf'):
+            # Unreachable, kept after every finite value
+            if self.infinite is None:
+                self.infinite = self._newBucket()
+            bucket = self.infinite
+        else:
+            if self.base is None:
+                self.base = int(entry[0])
+            pos = int(entry[0]) - self.base
+            buckets = self.buckets
+            if pos < self.cursor:
+                if self.started:
+                    raise ValueError('BucketQueue value {} is below the current minimum {}'.format(
+                                     entry[0], self.base + self.cursor))
+                # Nothing taken yet, so buckets can still be added below
+                buckets[:0] = [None] * -pos
+                self.base += pos
+                pos = 0
+            if pos >= len(buckets):
+                buckets.extend([None] * (pos + 1 - len(buckets)))
+            bucket = buckets[pos]
+            if bucket is None:
+                bucket = self._newBucket()
+                buckets[pos] = bucket
+        if self.tieBreak is fifoTieBreak or self.tieBreak is lifoTieBreak:
+            bucket.append(entry)
+        else:
+            heapq.heappush(bucket, (entry[1], entry[2], entry))
+
+    def _newBucket(self):
+        return deque() if self.tieBreak is fifoTieBreak or self.tieBreak is lifoTieBreak else []
+
+    def _topBucket(self):
+        # The lowest bucket with entries, live or stale, empty buckets on the way are dropped
+        buckets = self.buckets
+        self.started = True
+        while self.cursor < len(buckets):
+            if buckets[self.cursor]:
+                return buckets[self.cursor]
+            buckets[self.cursor] = None
+            self.cursor += 1
+            if self.cursor > 64 and 2 * self.cursor > len(buckets):
+                # Drop the buckets behind the cursor
+                del buckets[:self.cursor]
+                self.base += self.cursor
+                self.cursor = 0
+        return self.infinite
+
+    def _top(self):
+        # The live entry pop would return, stale entries on the way are dropped
+        while True:
+            bucket = self._topBucket()
+            if self.tieBreak is fifoTieBreak:
+                entry = bucket[0]
+            elif self.tieBreak is lifoTieBreak:
+                entry = bucket[-1]
+            else:
+                entry = bucket[0][2]
+            if self.registry.get(entry[3]) is entry:
+                return entry
+            self._popTop()
+            self.staleCount -= 1
+
+    def _popTop(self):
+        bucket = self._topBucket()
+        if self.tieBreak is fifoTieBreak:
+            bucket.popleft()
+        elif self.tieBreak is lifoTieBreak:
+            bucket.pop()
+        else:
+            heapq.heappop(bucket)
+
+    def _rebuild(self):
+        entries = sorted(self.registry.values(), key=lambda entry: entry[2])
+        self.buckets = [None] * len(self.buckets)
+        self.infinite = None
+        self.staleCount = 0
+        for entry in entries:
+            self._append(entry)
+
+    def __contains__(self, key):
+        return key in self.registry
+
+    def __len__(self):
+        return len(self.registry)
+
+    def __nonzero__(self):
+        return len(self.registry) != 0
@@ -0,0 +1,37 @@
+"""
+Michael Harrington
+
+This file provides a memoizing wrapper for heuristics. Graph search
+generates the same state from many parents, the cache keeps the
+heuristic value of the most recently used states by state key.
+"""
+
+from collections import OrderedDict
+
+class HeuristicCache():
+    def __init__(self, heuristic, maxSize):
+        self.heuristic = heuristic
+        self.maxSize = maxSize
+        # Ordered from least to most recently used
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, boardState):
+        key = boardState.key
+        cache = self.cache
+        if key in cache:
+            self.hits += 1
+            value = cache.pop(key)
+            cache[key] = value
+            return value
+
+        self.misses += 1
+        value = self.heuristic(boardState)
+        cache[key] = value
+        if len(cache) > self.maxSize:
+            cache.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self.cache)
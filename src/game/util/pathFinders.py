@@ -6,53 +6,143 @@ This file contains path finder algorithms
 
 from collections import deque
 from itertools import count
+from Queue import Empty
+import multiprocessing
+import signal
+import time
 
-from timer import profile
-from heap import Heap
+from heap import Heap, IndexedHeap, BucketQueue, fifoTieBreak
+from heuristicCache import HeuristicCache
+from searchStats import SearchStats
 
 """
-Search node class to hold a board state and other info
+Search node record to hold a board state and other info
+
+parent is the index of the parent node in the solver's SearchArena.
+Solvers drop boardState once a node is expanded, the record then only
+keeps what is needed to walk the path back from the goal.
 """
-class SearchNode():
-    def __init__(self, boardState, parent, action, pathCost):
+class SearchNode(object):
+    __slots__ = ('boardState', 'key', 'parent', 'action', 'pathCost', 'depth')
+
+    def __init__(self, boardState, parent, action, pathCost, depth=0):
         self.boardState = boardState
+        self.key = boardState.key
         self.parent = parent
         self.action = action
         self.pathCost = pathCost
-        # Derived attributes
-        self._path = None
+        self.depth = depth
 
-    @property
-    def path(self):
-        if not self._path:
-            self._path = []
-            if self.parent:
-                self._path.extend(self.parent.path)
-            self._path.append(self)
+"""
+Search arena holds the node records owned by a solver, a node is
+referenced by its index. Depth first solvers use it as their current
+path, so the index of a node is its depth.
+"""
+class SearchArena(list):
+    def add(self, node):
+        self.append(node)
+        return len(self) - 1
 
-        return self._path
+    def pathTo(self, node):
+        path = [node]
+        while node.parent is not None:
+            node = self[node.parent]
+            path.append(node)
+        path.reverse()
+        return path
 
-    # NOTE: Equal check is only based on board state!
-    def __eq__(self, other):
-        return self.boardState == other.boardState
+"""
+Batch expansion
 
-    def __hash__(self):
-        return hash(self.boardState)
+createExpander returns expand(boardState) -> (keys, codes, costs, child).
+keys, codes and costs are parallel lists over the successors, child(code)
+returns the (boardState, action) of one successor. States that provide
+expand() and child() themselves are expanded in one pass and only the
+successors a solver keeps are built, their step costs must agree with
+costCalc. Other states fall back to neighborGen and costCalc. Given
+stats, generating successors, building children and costCalc are timed
+as the work is actually done.
+"""
+def createExpander(neighborGen, costCalc, stats=None):
+    if stats is None:
+        stats = SearchStats()
+    timedNeighborGen = stats.timer('successors', lambda boardState: list(neighborGen(boardState)))
+    costCalc = stats.timer('cost', costCalc)
+    def expand(boardState):
+        if hasattr(boardState, 'expand'):
+            keys, codes, costs = stats.timer('successors', boardState.expand)()
+            return keys, codes, costs, stats.timer('children', boardState.child)
+        neighbors = timedNeighborGen(boardState)
+        keys = [newState.key for newState, action in neighbors]
+        costs = [costCalc(newState) for newState, action in neighbors]
+        return keys, range(len(neighbors)), costs, neighbors.__getitem__
+
+    return expand
+
+"""
+Heuristics may declare integerValued and consistent as attributes. With
+both set and integer step costs, f-values are small integers that never
+decrease along a path, and A* uses a monotone BucketQueue frontier
+instead of a heap unless bucketQueue says otherwise.
+"""
+def useBucketQueue(heuristic, bucketQueue=None):
+    if bucketQueue is not None:
+        return bucketQueue
+    return getattr(heuristic, 'integerValued', False) and getattr(heuristic, 'consistent', False)
 
 """
 Base Search Class
 
 Provides helper methods for use after completing search.
-Subclasses expected to set searchNodePath to complete path.
+Subclasses expected to call foundGoal with the goal node, the path
+is only built from the arena at that point.
+Subclasses list the keyword options their constructor accepts in options.
+Every solver records SearchStats in stats, the telemetry option also
+times the functions it was given. complete is cleared by solvers whose
+search was cut short by a budget, the path they found may not be the
+one a full search would have.
 """
 class SearchSolver():
+    options = ()
+    complete = True
+    searchNodePath = None
+    heuristicCache = None
+    stats = None
+
+    def createStats(self, telemetry):
+        self.stats = SearchStats(telemetry)
+        return self.stats
+
+    def cachedHeuristic(self, heuristic, heuristicCacheSize):
+        # Wraps heuristic in an LRU cache when a cache size is given
+        if not heuristicCacheSize:
+            return heuristic
+        self.heuristicCache = HeuristicCache(heuristic, heuristicCacheSize)
+        return self.heuristicCache
+
+    def foundGoal(self, initialState, arena, goalNode):
+        self.initialState = initialState
+        self.searchNodePath = arena.pathTo(goalNode)
+
     @property
     def pathFound(self):
         return bool(self.searchNodePath != None)
 
+    @property
+    def pathCost(self):
+        return self.searchNodePath[-1].pathCost
+
+    @property
+    def finalState(self):
+        return self.searchNodePath[-1].boardState
+
     @property
     def boardStatePath(self):
-        return list(map(lambda n: n.boardState, self.searchNodePath))
+        # Expanded nodes no longer hold their board state, replay the actions
+        boardStates = [self.initialState]
+        for action in self.actionPath:
+            boardStates.append(boardStates[-1].applyAction(action))
+        return boardStates
 
     @property
     def actionPath(self):
@@ -62,7 +152,13 @@ class SearchSolver():
 Breadth First Tree Search
 """
 class BFTS(SearchSolver):
-    def __init__(self, initialState, neighborGen, costCalc, isGoal):
+    options = ('telemetry',)
+
+    def __init__(self, initialState, neighborGen, costCalc, isGoal, telemetry=False):
+        stats = self.createStats(telemetry)
+        neighborGen = stats.generatorTimer('successors', neighborGen)
+        costCalc = stats.timer('cost', costCalc)
+        arena = SearchArena()
         frontier = deque()
         frontier.append( SearchNode(initialState, None, None, 0) )
         while True:
@@ -72,59 +168,131 @@ class BFTS(SearchSolver):
             selectNode = frontier.popleft()
 
             if isGoal(selectNode.boardState):
-                self.searchNodePath = selectNode.path
+                self.foundGoal(initialState, arena, selectNode)
                 break
-            for newNode, action in neighborGen(selectNode.boardState):
+            stats.expanded += 1
+            boardState = selectNode.boardState
+            selectNode.boardState = None
+            selectIndex = arena.add(selectNode)
+            for newNode, action in neighborGen(boardState):
+                stats.generated += 1
                 nodeCost = selectNode.pathCost + costCalc(newNode)
-                frontier.append( SearchNode(newNode, selectNode, action, nodeCost) )
+                frontier.append( SearchNode(newNode, selectIndex, action, nodeCost, selectNode.depth + 1) )
+            stats.observe(len(frontier), 0)
 
 """
 Depth Limited Graph Search
+
+Depth first search that does not expand nodes at depthLimit.
+States are kept in a table with the shallowest depth they were
+reached at, a state reached again no shallower (which includes any
+state on the current path) has nothing new to offer and is pruned.
+cutoff is set when the depth limit kept some node from expanding.
+Counts are added to stats when given one.
+
+Given depths, the table of an earlier search with a lower limit, a
+state reached deeper than depths holds is pruned as well. Every state
+in such a table was reached at its shallowest depth, so only the
+arrivals that would be beaten later in the same search are dropped and
+each state is expanded once. The table of this search is left in
+depths for the next one.
 """
 class DLGS(SearchSolver):
-    def __init__(self, initialState, neighborGen, costCalc, isGoal, depthLimit):
-        explored = set()
-        frontier = deque()
-        frontier.append( SearchNode(initialState, None, None, 0) )
-        while True:
-            if not frontier:
-                self.searchNodePath = None
-                break
-            selectNode = frontier.pop()
+    options = ('telemetry',)
 
-            if isGoal(selectNode.boardState):
-                self.searchNodePath = selectNode.path
-                break
-            explored.add(selectNode)
-            if len(selectNode.path) > depthLimit:
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, depthLimit,
+                  telemetry=False, stats=None, depths=None ):
+        if stats is None:
+            stats = self.createStats(telemetry)
+        self.stats = stats
+        neighborGen = stats.generatorTimer('successors', neighborGen)
+        costCalc = stats.timer('cost', costCalc)
+        self.cutoff = False
+        known = depths or {}
+        arena = SearchArena()
+        rootNode = SearchNode(initialState, None, None, 0)
+        seen = {rootNode.key: 0}
+        self.depths = seen
+        if isGoal(initialState):
+            self.foundGoal(initialState, arena, rootNode)
+            return
+
+        arena.add(rootNode)
+        stack = [neighborGen(initialState)]
+        stats.expanded += 1
+        while stack:
+            selectNode = arena[-1]
+            if selectNode.depth >= depthLimit:
+                self.cutoff = True
+                stack.pop()
+                arena.pop()
                 continue
-            for newNode, action in neighborGen(selectNode.boardState):
-                nodeCost = selectNode.pathCost + costCalc(newNode)
-                newSearchNode = SearchNode(newNode, selectNode, action, nodeCost)
-                if newSearchNode in frontier or newSearchNode in explored:
+            newDepth = selectNode.depth + 1
+            for newState, action in stack[-1]:
+                stats.generated += 1
+                key = newState.key
+                if seen.get(key, newDepth + 1) <= newDepth or known.get(key, newDepth) < newDepth:
+                    stats.exploredHits += 1
                     continue
-                frontier.append(newSearchNode)
+                seen[key] = newDepth
+
+                nodeCost = selectNode.pathCost + costCalc(newState)
+                newSearchNode = SearchNode(newState, selectNode.depth, action, nodeCost, newDepth)
+                if isGoal(newState):
+                    self.foundGoal(initialState, arena, newSearchNode)
+                    return
+                arena.add(newSearchNode)
+                stack.append(neighborGen(newState))
+                stats.expanded += 1
+                stats.observe(len(stack), len(seen) + len(known))
+                break
+            else:
+                stack.pop()
+                arena.pop()
 
 """
 Iterative Deepening Depth First Graph Search
+
+Runs DLGS with growing depth limits, each iteration handed the depth
+table of the one before it. When an iteration was never cut off by its
+limit, deeper iterations can not find anything new and the search
+stops without a path.
 """
 class IDDFGS(SearchSolver):
-    def __init__(self, initialState, neighborGen, costCalc, isGoal):
+    options = ('telemetry',)
+
+    def __init__(self, initialState, neighborGen, costCalc, isGoal, telemetry=False):
+        stats = self.createStats(telemetry)
+        depths = None
         for depthLimit in count():
-            solver = DLGS(initialState, neighborGen, costCalc, isGoal, depthLimit)
+            solver = DLGS(initialState, neighborGen, costCalc, isGoal, depthLimit, stats=stats, depths=depths)
             if solver.pathFound:
+                self.initialState = initialState
                 self.searchNodePath = solver.searchNodePath
                 break
+            if not solver.cutoff:
+                break
+            depths = solver.depths
 
 """
 Greedy Best First Graph Search
+
+The frontier is ordered on h alone, which can go down along a path, so
+it is always a Heap and never a BucketQueue.
 """
 class GrBFGS(SearchSolver):
-    def __init__(self, initialState, neighborGen, costCalc, isGoal, heuristic):
+    options = ('tieBreak', 'heuristicCacheSize', 'telemetry')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  tieBreak=fifoTieBreak, heuristicCacheSize=None, telemetry=False ):
+        frontier = Heap(tieBreak)
+        stats = self.createStats(telemetry)
+        heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        expand = createExpander(neighborGen, costCalc, stats)
         explored = set()
-        frontier = Heap()
+        arena = SearchArena()
         newSearchNode = SearchNode(initialState, None, None, 0)
-        frontier.push(newSearchNode, heuristic(initialState))
+        frontier.push(newSearchNode, heuristic(initialState), newSearchNode.key)
         while True:
             if not frontier:
                 self.searchNodePath = None
@@ -132,25 +300,47 @@ class GrBFGS(SearchSolver):
             selectNode = frontier.pop()
 
             if isGoal(selectNode.boardState):
-                self.searchNodePath = selectNode.path
+                self.foundGoal(initialState, arena, selectNode)
                 break
-            explored.add(selectNode)
-            for newState, action in neighborGen(selectNode.boardState):
-                nodeCost = selectNode.pathCost + costCalc(newState)
-                newSearchNode = SearchNode(newState, selectNode, action, nodeCost)
-                if newSearchNode in frontier or newSearchNode in explored:
+            explored.add(selectNode.key)
+            boardState = selectNode.boardState
+            selectNode.boardState = None
+            selectIndex = arena.add(selectNode)
+            keys, codes, costs, child = expand(boardState)
+            stats.expanded += 1
+            stats.generated += len(keys)
+            for key, code, stepCost in zip(keys, codes, costs):
+                if key in explored:
+                    stats.exploredHits += 1
+                    continue
+                if key in frontier:
+                    stats.frontierHits += 1
                     continue
-                frontier.push(newSearchNode, heuristic(newState))
+                nodeCost = selectNode.pathCost + stepCost
+                newState, action = child(code)
+                newSearchNode = SearchNode(newState, selectIndex, action, nodeCost, selectNode.depth + 1)
+                frontier.push(newSearchNode, heuristic(newState), key, nodeCost)
+            stats.observe(len(frontier), len(explored))
 
 """
 A-Star Graph Search
+
+The frontier holds one node per state, when a cheaper path to a
+state in the frontier is found its node is replaced (decrease-key).
 """
 class AStarGS(SearchSolver):
-    def __init__(self, initialState, neighborGen, costCalc, isGoal, heuristic):
+    options = ('tieBreak', 'heuristicCacheSize', 'telemetry', 'bucketQueue')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  tieBreak=fifoTieBreak, heuristicCacheSize=None, telemetry=False, bucketQueue=None ):
+        frontier = BucketQueue(tieBreak) if useBucketQueue(heuristic, bucketQueue) else IndexedHeap(tieBreak)
+        stats = self.createStats(telemetry)
+        heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        expand = createExpander(neighborGen, costCalc, stats)
         explored = set()
-        frontier = Heap()
+        arena = SearchArena()
         newSearchNode = SearchNode(initialState, None, None, 0)
-        frontier.uniquePush(newSearchNode, heuristic(initialState))
+        frontier.uniquePush(newSearchNode, heuristic(initialState), newSearchNode.key)
         while True:
             if not frontier:
                 self.searchNodePath = None
@@ -158,12 +348,783 @@ class AStarGS(SearchSolver):
             selectNode = frontier.pop()
 
             if isGoal(selectNode.boardState):
-                self.searchNodePath = selectNode.path
+                self.foundGoal(initialState, arena, selectNode)
                 break
-            explored.add(selectNode)
-            for newState, action in neighborGen(selectNode.boardState):
-                nodeCost = selectNode.pathCost + costCalc(newState)
-                newSearchNode = SearchNode(newState, selectNode, action, nodeCost)
-                if newSearchNode in frontier or newSearchNode in explored:
+            explored.add(selectNode.key)
+            boardState = selectNode.boardState
+            selectNode.boardState = None
+            selectIndex = arena.add(selectNode)
+            keys, codes, costs, child = expand(boardState)
+            stats.expanded += 1
+            stats.generated += len(keys)
+            for key, code, stepCost in zip(keys, codes, costs):
+                if key in explored:
+                    stats.exploredHits += 1
+                    continue
+                nodeCost = selectNode.pathCost + stepCost
+                frontierNode = frontier.get(key)
+                if frontierNode is not None and frontierNode.pathCost <= nodeCost:
+                    stats.frontierHits += 1
+                    continue
+                newState, action = child(code)
+                newSearchNode = SearchNode(newState, selectIndex, action, nodeCost, selectNode.depth + 1)
+                frontier.uniquePush(newSearchNode, nodeCost + heuristic(newState), key, nodeCost)
+            stats.observe(len(frontier), len(explored))
+
+"""
+Anytime Repairing A-Star (ARA*)
+
+Runs A* on f = g + weight * h, starting at initialWeight and lowering
+the weight by weightStep after each search down to 1. States keep
+their lowest g across searches. A state whose g drops after it was
+expanded in the current search goes to incons instead of being
+expanded again, and the next search starts from the frontier plus
+incons so earlier effort is reused. Goals are taken when generated and
+a search ends once the frontier holds nothing with f below the best
+goal.
+
+Each finished search that improves the cost or the bound records an
+incumbent in incumbents, with the bound min(weight, cost / min(g + h))
+over the frontier and incons, which holds for an admissable heuristic. The search stops once the
+bound reaches 1, or early when timeLimit seconds or expansionLimit
+expansions run out. A better path found by an unfinished search is
+still kept, with the bound of the last finished one, and complete is
+cleared, also when the budget runs out before any path is found.
+"""
+class ARAStar(SearchSolver):
+    options = ( 'initialWeight', 'weightStep', 'timeLimit', 'expansionLimit',
+                'tieBreak', 'heuristicCacheSize', 'telemetry' )
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  initialWeight=3.0, weightStep=0.5, timeLimit=None, expansionLimit=None,
+                  tieBreak=fifoTieBreak, heuristicCacheSize=None, telemetry=False ):
+        stats = self.createStats(telemetry)
+        heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        expand = createExpander(neighborGen, costCalc, stats)
+        startTime = time.time()
+        self.initialState = initialState
+        self.incumbents = []
+        self.bound = None
+        arena = SearchArena()
+        bestCost = {}
+        hValues = {}
+        closed = set()
+        incons = {}
+        goalNode = None
+        goalCost = float('inf')
+        weight = max(1.0, initialWeight)
+
+        rootNode = SearchNode(initialState, None, None, 0)
+        bestCost[rootNode.key] = 0
+        if isGoal(initialState):
+            goalNode, goalCost = rootNode, 0
+        hValues[rootNode.key] = heuristic(initialState)
+        frontier = IndexedHeap(tieBreak)
+        frontier.uniquePush(rootNode, weight * hValues[rootNode.key], rootNode.key)
+        while True:
+            outOfBudget = False
+            while frontier and frontier.minValue() < goalCost:
+                if ( (expansionLimit is not None and stats.expanded >= expansionLimit) or
+                     (timeLimit is not None and time.time() - startTime >= timeLimit) ):
+                    outOfBudget = True
+                    break
+                selectNode = frontier.pop()
+                closed.add(selectNode.key)
+                boardState = selectNode.boardState
+                selectNode.boardState = None
+                selectIndex = arena.add(selectNode)
+                keys, codes, costs, child = expand(boardState)
+                stats.expanded += 1
+                stats.generated += len(keys)
+                for key, code, stepCost in zip(keys, codes, costs):
+                    nodeCost = selectNode.pathCost + stepCost
+                    if bestCost.get(key, nodeCost + 1) <= nodeCost:
+                        if key in closed:
+                            stats.exploredHits += 1
+                        else:
+                            stats.frontierHits += 1
+                        continue
+                    bestCost[key] = nodeCost
+                    newState, action = child(code)
+                    newSearchNode = SearchNode(newState, selectIndex, action, nodeCost, selectNode.depth + 1)
+                    if isGoal(newState):
+                        if nodeCost < goalCost:
+                            goalNode, goalCost = newSearchNode, nodeCost
+                    elif key in closed:
+                        incons[key] = newSearchNode
+                    else:
+                        if key not in hValues:
+                            hValues[key] = heuristic(newState)
+                        frontier.uniquePush(newSearchNode, nodeCost + weight * hValues[key], key, nodeCost)
+                stats.observe(len(frontier) + len(incons), len(closed))
+
+            if outOfBudget:
+                self.complete = False
+                if goalNode is not None and (not self.incumbents or goalCost < self.incumbents[-1]['pathCost']):
+                    self._addIncumbent(arena, goalNode, weight, self.bound, stats, startTime)
+                break
+            if goalNode is None:
+                break
+
+            openNodes = frontier.elements() + list(incons.values())
+            lowerBound = min([node.pathCost + hValues[node.key] for node in openNodes] or [goalCost])
+            bound = max(1.0, min(weight, goalCost / float(lowerBound))) if lowerBound > 0 else weight
+            if not self.incumbents or goalCost < self.incumbents[-1]['pathCost'] or bound < self.bound:
+                self._addIncumbent(arena, goalNode, weight, bound, stats, startTime)
+            if weight <= 1 or bound <= 1:
+                break
+
+            weight = max(1.0, weight - weightStep)
+            frontier = IndexedHeap(tieBreak)
+            for node in openNodes:
+                frontier.uniquePush(node, node.pathCost + weight * hValues[node.key], node.key, node.pathCost)
+            incons = {}
+            closed = set()
+
+    def _addIncumbent(self, arena, goalNode, weight, bound, stats, startTime):
+        self.searchNodePath = arena.pathTo(goalNode)
+        self.bound = bound
+        self.incumbents.append({ 'pathCost': goalNode.pathCost,
+                                 'weight': weight,
+                                 'bound': bound,
+                                 'expanded': stats.expanded,
+                                 'time': time.time() - startTime })
+
+"""
+Bidirectional A-Star Graph Search
+
+createBackward(initialState) is required, positional after the
+heuristic. It runs the backward search from the goal and returns an
+object with distance(state), a consistent lower bound on the cost to
+the goal found backwards, and completion(state), the
+[(state, action, stepCost)] steps finishing a path from state when the
+backward search reached it, or None when the two searches do not meet.
+
+The forward search is A* on the max of the heuristic and the backward
+distance. Every generated state is checked against the backward search
+and the cheapest meeting is kept. Since f never overestimates, the
+search stops with the meeting path once the frontier holds nothing
+below its cost, which is usually long before the goal itself would be
+expanded.
+"""
+class BidirectionalAStar(SearchSolver):
+    options = ('tieBreak', 'heuristicCacheSize', 'createBackward', 'telemetry')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic, createBackward,
+                  tieBreak=fifoTieBreak, heuristicCacheSize=None, telemetry=False ):
+        stats = self.createStats(telemetry)
+        heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        backward = createBackward(initialState)
+        expand = createExpander(neighborGen, costCalc, stats)
+        explored = set()
+        arena = SearchArena()
+        frontier = IndexedHeap(tieBreak)
+        self.meetCost = float('inf')
+        self.meetNode = None
+        self.meetSteps = None
+
+        newSearchNode = SearchNode(initialState, None, None, 0)
+        self._meet(backward, newSearchNode, initialState)
+        frontier.uniquePush(newSearchNode, self._estimate(heuristic, backward, initialState), newSearchNode.key)
+        while frontier and frontier.minValue() < self.meetCost:
+            selectNode = frontier.pop()
+
+            if isGoal(selectNode.boardState):
+                self.foundGoal(initialState, arena, selectNode)
+                return
+            explored.add(selectNode.key)
+            boardState = selectNode.boardState
+            selectNode.boardState = None
+            selectIndex = arena.add(selectNode)
+            keys, codes, costs, child = expand(boardState)
+            stats.expanded += 1
+            stats.generated += len(keys)
+            for key, code, stepCost in zip(keys, codes, costs):
+                if key in explored:
+                    stats.exploredHits += 1
                     continue
-                frontier.uniquePush(newSearchNode, nodeCost + heuristic(newState))
+                nodeCost = selectNode.pathCost + stepCost
+                frontierNode = frontier.get(key)
+                if frontierNode is not None and frontierNode.pathCost <= nodeCost:
+                    stats.frontierHits += 1
+                    continue
+                newState, action = child(code)
+                newSearchNode = SearchNode(newState, selectIndex, action, nodeCost, selectNode.depth + 1)
+                self._meet(backward, newSearchNode, newState)
+                frontier.uniquePush( newSearchNode, nodeCost + self._estimate(heuristic, backward, newState),
+                                     key, nodeCost )
+            stats.observe(len(frontier), len(explored))
+
+        if self.meetNode is not None:
+            self.initialState = initialState
+            self.searchNodePath = arena.pathTo(self.meetNode)
+            node = self.meetNode
+            for boardState, action, stepCost in self.meetSteps:
+                node = SearchNode(boardState, None, action, node.pathCost + stepCost, node.depth + 1)
+                self.searchNodePath.append(node)
+
+    def _estimate(self, heuristic, backward, boardState):
+        return max(heuristic(boardState), backward.distance(boardState))
+
+    def _meet(self, backward, node, boardState):
+        # Keeps the path through node when it is the cheapest meeting so far
+        if not node.pathCost + backward.distance(boardState) < self.meetCost:
+            return
+        steps = backward.completion(boardState)
+        if steps is not None:
+            self.meetCost = node.pathCost + backward.distance(boardState)
+            self.meetNode = node
+            self.meetSteps = steps
+
+"""
+Hash Distributed A-Star Graph Search
+
+Runs A* over workers processes. Each state is owned by the worker at
+mixKey(key) % workers, every worker keeps the open and closed lists of
+its own states and sends generated children to their owners in
+batches of batchSize. States travel as their key, initialState.fromKey
+rebuilds them on the other side. Expansions are not globally ordered,
+so a state reached with a lower g after it was closed is reopened.
+
+A goal is only taken as the incumbent, workers stop expanding once
+their open list holds nothing with f below it. The search ends when
+every worker is idle and no batch is in flight, which the shared lock
+lets the main process see as one snapshot. Then no f below the
+incumbent is left anywhere, so with an admissable heuristic the
+incumbent is optimal. The path is traced back through the owners of
+each state and replayed from the initial state. Worker stats are added
+up, so peaks are the sum of the workers' peaks.
+
+Workers are terminated and joined on every way out of the search,
+errors included. While they run, SIGTERM is turned into SystemExit so
+a solve killed from outside does not leave them behind.
+"""
+class HDAStar(SearchSolver):
+    options = ('workers', 'batchSize', 'tieBreak', 'heuristicCacheSize', 'telemetry')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  workers=None, batchSize=64, tieBreak=fifoTieBreak, heuristicCacheSize=None,
+                  telemetry=False ):
+        if not workers:
+            workers = multiprocessing.cpu_count()
+        self.createStats(telemetry)
+        heuristic = self.cachedHeuristic(heuristic, heuristicCacheSize)
+        shared = HDAShared(workers)
+        inboxes = [multiprocessing.Queue() for i in range(workers)]
+        traces = multiprocessing.Queue()
+        processes = []
+        for index in range(workers):
+            worker = HDAWorker( index, initialState, neighborGen, costCalc, isGoal, heuristic,
+                                tieBreak, batchSize, telemetry, shared, inboxes, traces )
+            processes.append(multiprocessing.Process(target=worker.run))
+
+        # SIGTERM raises SystemExit while workers run, so the cleanup below
+        # runs however the search ends
+        handlerSet = False
+        try:
+            previousHandler = signal.signal(signal.SIGTERM, _exitOnSignal)
+            handlerSet = True
+        except ValueError:
+            # Handlers can only be set from the main thread
+            pass
+        stopped = False
+        try:
+            for process in processes:
+                process.daemon = True
+                process.start()
+            rootKey = initialState.key
+            with shared.lock:
+                shared.pending.value += 1
+            inboxes[shared.owner(rootKey)].put(('nodes', [(rootKey, 0, None, None)]))
+            while not shared.finished():
+                if not all(process.is_alive() for process in processes):
+                    raise RuntimeError('HDAStar worker exited before the search ended')
+                time.sleep(0.001)
+
+            if shared.incumbent.value != float('inf'):
+                self._tracePath(initialState, costCalc, shared, inboxes, traces)
+            for inbox in inboxes:
+                inbox.put(('stop',))
+            # Each worker answers the stop with its stats
+            for process in processes:
+                self.stats.merge(traces.get())
+            stopped = True
+        finally:
+            for process in processes:
+                if process.pid is None:
+                    continue
+                if stopped:
+                    process.join(1.0)
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            if handlerSet:
+                signal.signal(signal.SIGTERM, previousHandler)
+
+    def _tracePath(self, initialState, costCalc, shared, inboxes, traces):
+        # Asks the owner of each state on the path for its parent, back to the root
+        codes = []
+        key = None
+        owner = shared.goalOwner.value
+        while True:
+            inboxes[owner].put(('trace', key))
+            parentKey, code = traces.get()
+            if parentKey is None:
+                break
+            codes.append(code)
+            key = parentKey
+            owner = shared.owner(key)
+
+        self.initialState = initialState
+        node = SearchNode(initialState, None, None, 0)
+        self.searchNodePath = [node]
+        for code in reversed(codes):
+            boardState, action = node.boardState.child(code)
+            node = SearchNode(boardState, None, action, node.pathCost + costCalc(boardState), node.depth + 1)
+            self.searchNodePath.append(node)
+
+def _exitOnSignal(signum, frame):
+    raise SystemExit(128 + signum)
+
+"""
+State keys pack each slot's pose into a few bits, the boat's lowest, and
+hash(key) of an int is the int itself. mixKey folds the key into 64
+bits and runs the splitmix64 finalizer over it, so every slot's pose
+decides which worker owns a state.
+"""
+def mixKey(key):
+    mixed = 0
+    while key:
+        mixed ^= key & 0xffffffffffffffff
+        key >>= 64
+    mixed = ((mixed ^ (mixed >> 30)) * 0xbf58476d1ce4e5b9) & 0xffffffffffffffff
+    mixed = ((mixed ^ (mixed >> 27)) * 0x94d049bb133111eb) & 0xffffffffffffffff
+    return mixed ^ (mixed >> 31)
+
+"""
+State shared by the HDAStar processes, guarded by lock. pending counts
+batches sent and not yet taken in, idle flags the workers without
+anything left below the incumbent.
+"""
+class HDAShared():
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = multiprocessing.Lock()
+        self.pending = multiprocessing.RawValue('l', 0)
+        self.idle = multiprocessing.RawArray('b', [1] * workers)
+        self.incumbent = multiprocessing.RawValue('d', float('inf'))
+        self.goalOwner = multiprocessing.RawValue('i', -1)
+
+    def owner(self, key):
+        return mixKey(key) % self.workers
+
+    def finished(self):
+        with self.lock:
+            return self.pending.value == 0 and all(self.idle)
+
+"""
+One HDAStar worker process. closed maps each expanded state key to
+(g, parentKey, code), code being the action code of the move from the
+parent. Open nodes are (key, g, parentKey, code, boardState).
+"""
+class HDAWorker():
+    def __init__( self, index, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  tieBreak, batchSize, telemetry, shared, inboxes, traces ):
+        self.index = index
+        self.initialState = initialState
+        self.stats = SearchStats(telemetry)
+        self.expand = createExpander(neighborGen, costCalc, self.stats)
+        self.isGoal = isGoal
+        self.heuristic = self.stats.timer('heuristic', heuristic)
+        self.batchSize = batchSize
+        self.shared = shared
+        self.inboxes = inboxes
+        self.traces = traces
+        self.frontier = IndexedHeap(tieBreak)
+        self.closed = {}
+        self.outboxes = [[] for inbox in inboxes]
+        self.goalKey = None
+
+    def run(self):
+        # Workers are only ever stopped outright
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        inbox = self.inboxes[self.index]
+        while True:
+            if self._hasWork():
+                try:
+                    message = inbox.get_nowait()
+                except Empty:
+                    self._expandNext()
+                    continue
+            else:
+                for owner, outbox in enumerate(self.outboxes):
+                    if outbox:
+                        self._send(owner)
+                with self.shared.lock:
+                    self.shared.idle[self.index] = 1
+                message = inbox.get()
+
+            if message[0] == 'nodes':
+                with self.shared.lock:
+                    self.shared.idle[self.index] = 0
+                    self.shared.pending.value -= 1
+                for node in message[1]:
+                    self._receive(*node)
+            elif message[0] == 'trace':
+                key = message[1] if message[1] is not None else self.goalKey
+                g, parentKey, code = self.closed[key]
+                self.traces.put((parentKey, code))
+            else:
+                self.traces.put(self.stats.toDict())
+                break
+
+    def _hasWork(self):
+        return bool(self.frontier) and self.frontier.minValue() < self.shared.incumbent.value
+
+    def _receive(self, key, g, parentKey, code):
+        closedNode = self.closed.get(key)
+        if closedNode is not None and closedNode[0] <= g:
+            self.stats.exploredHits += 1
+            return
+        frontierNode = self.frontier.get(key)
+        if frontierNode is not None:
+            if frontierNode[1] <= g:
+                self.stats.frontierHits += 1
+                return
+            boardState = frontierNode[4]
+        else:
+            boardState = self.initialState.fromKey(key)
+        self.frontier.uniquePush((key, g, parentKey, code, boardState), g + self.heuristic(boardState), key, g)
+
+    def _expandNext(self):
+        key, g, parentKey, code, boardState = self.frontier.pop()
+        self.closed[key] = (g, parentKey, code)
+        if self.isGoal(boardState):
+            with self.shared.lock:
+                if g < self.shared.incumbent.value:
+                    self.shared.incumbent.value = g
+                    self.shared.goalOwner.value = self.index
+                    self.goalKey = key
+            return
+        keys, codes, costs, child = self.expand(boardState)
+        self.stats.expanded += 1
+        self.stats.generated += len(keys)
+        for childKey, childCode, stepCost in zip(keys, codes, costs):
+            owner = self.shared.owner(childKey)
+            if owner == self.index:
+                self._receive(childKey, g + stepCost, key, childCode)
+            else:
+                self.outboxes[owner].append((childKey, g + stepCost, key, childCode))
+                if len(self.outboxes[owner]) >= self.batchSize:
+                    self._send(owner)
+        self.stats.observe(len(self.frontier), len(self.closed))
+
+    def _send(self, owner):
+        with self.shared.lock:
+            self.shared.pending.value += 1
+        self.inboxes[owner].put(('nodes', self.outboxes[owner]))
+        self.outboxes[owner] = []
+
+"""
+Iterative Deepening A-Star
+
+Repeats a depth first search bounded by f = g + h. Only the current
+path is kept, plus a transposition table of at most tableSize states
+holding the lowest g each state was reached with during the current
+iteration. A state reached again with no lower g is pruned, since its
+subtree was already searched with at least as much budget. Children
+come from the batch expander and are only built once they pass the path
+and table checks.
+
+Raising the bound only to the smallest f that exceeded it needs one
+iteration per distinct f-value, which on these puzzles means hundreds
+of iterations. Instead the children cut off by the bound are counted by
+f and the next bound is the lowest f that lets at least
+(boundGrowth - 1) times the nodes expanded in the iteration through, so
+the work per iteration grows about geometrically. boundGrowth 1 gives
+the classic minimal step. A goal found under a bound past the optimal
+cost may not be the cheapest, so the iteration goes on with every path
+of f at or above the best goal cost pruned, and ends with no path of
+lower f left unsearched. With an admissable heuristic the path found is
+optimal. Children with infinite f can not reach the goal and are
+dropped. A* expands fewer nodes, IDA* is for when its frontier does not
+fit in memory.
+"""
+class IDAStar(SearchSolver):
+    options = ('tableSize', 'boundGrowth', 'heuristicCacheSize', 'telemetry')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  tableSize=1000000, boundGrowth=2.0, heuristicCacheSize=None, telemetry=False ):
+        stats = self.createStats(telemetry)
+        heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        expand = createExpander(neighborGen, costCalc, stats)
+        self.initialState = initialState
+        self.bounds = []
+        rootNode = SearchNode(initialState, None, None, 0)
+        if isGoal(initialState):
+            self.foundGoal(initialState, SearchArena(), rootNode)
+            return
+
+        bound = heuristic(initialState)
+        while bound is not None and bound != float('inf'):
+            self.bounds.append(bound)
+            expanded = stats.expanded
+            exceeded = self._boundedSearch(rootNode, bound, expand, isGoal, heuristic, tableSize)
+            if self.pathFound:
+                break
+            bound = self._nextBound(exceeded, (boundGrowth - 1) * (stats.expanded - expanded))
+
+    def _boundedSearch(self, rootNode, bound, expand, isGoal, heuristic, tableSize):
+        # Keeps the cheapest goal path within bound, returns the count of children cut off per f
+        stats = self.stats
+        exceeded = {}
+        goalCost = float('inf')
+        arena = SearchArena()
+        arena.add(rootNode)
+        table = {rootNode.key: 0}
+        onPath = set([rootNode.key])
+        keys, codes, costs, child = expand(rootNode.boardState)
+        stack = [(iter(zip(keys, codes, costs)), child)]
+        stats.expanded += 1
+        stats.generated += len(keys)
+        while stack:
+            selectNode = arena[-1]
+            successors, child = stack[-1]
+            for key, code, stepCost in successors:
+                if key in onPath:
+                    stats.exploredHits += 1
+                    continue
+                nodeCost = selectNode.pathCost + stepCost
+                seenCost = table.get(key)
+                if seenCost is not None and seenCost <= nodeCost:
+                    stats.exploredHits += 1
+                    continue
+                if nodeCost >= goalCost:
+                    continue
+                newState, action = child(code)
+                f = nodeCost + heuristic(newState)
+                if f >= goalCost:
+                    continue
+                if f > bound:
+                    if f != float('inf'):
+                        exceeded[f] = exceeded.get(f, 0) + 1
+                    continue
+                if seenCost is not None or len(table) < tableSize:
+                    table[key] = nodeCost
+
+                newSearchNode = SearchNode(newState, selectNode.depth, action, nodeCost, selectNode.depth + 1)
+                if isGoal(newState):
+                    # Paths of lower f may still lead to a cheaper goal
+                    goalCost = nodeCost
+                    self.foundGoal(self.initialState, arena, newSearchNode)
+                    continue
+                onPath.add(key)
+                arena.add(newSearchNode)
+                keys, codes, costs, child = expand(newState)
+                stack.append((iter(zip(keys, codes, costs)), child))
+                stats.expanded += 1
+                stats.generated += len(keys)
+                stats.observe(len(stack), len(table))
+                break
+            else:
+                stack.pop()
+                arena.pop()
+                onPath.discard(selectNode.key)
+        return exceeded
+
+    def _nextBound(self, exceeded, target):
+        # Lowest cut off f letting at least target children through, None if nothing was cut off
+        count = 0
+        for f in sorted(exceeded):
+            count += exceeded[f]
+            if count >= target:
+                return f
+        return max(exceeded) if exceeded else None
+
+"""
+Simplified Memory-Bounded A-Star (SMA*)
+
+Keeps at most nodeCap nodes in memory as a tree rooted at the initial
+state. Expanding a node only adds its missing successors with the
+lowest f, the rest are left out as if evicted, making room by evicting
+the leaf with the highest f, shallowest first. The node being expanded
+is never a leaf and is never evicted or requeued while its children are
+added. A parent remembers the lowest f of its evicted children in
+forgottenF and goes back into the frontier with it, when chosen again
+it regenerates its missing children with f no lower than forgottenF.
+f values use pathmax and are backed up from children into parents, so
+a leaf evicted later still carries the best known bound for its whole
+subtree.
+
+An evicted child that was expanded also leaves its backed up f in its
+parent's forgotten entries, and gets it back when regenerated, so the
+same subtree is not searched again at the old bound. Entries go with
+their parent and there are at most forgottenCap of them, nodeCap by
+default, past that only forgottenF is kept. A successor is skipped when
+its state is already in memory with no higher g, which also prunes
+cycles. A child that does not fit even after eviction gets f = inf, no
+path within the memory cap leads through it. With an admissable heuristic and enough
+memory for an optimal path the path found is optimal.
+"""
+class SMANode(object):
+    __slots__ = ( 'boardState', 'key', 'parent', 'code', 'action', 'g', 'f', 'depth',
+                  'children', 'forgotten', 'forgottenF', 'expanded' )
+
+    def __init__(self, boardState, parent, code, action, g, f, depth):
+        self.boardState = boardState
+        self.key = boardState.key
+        self.parent = parent
+        self.code = code
+        self.action = action
+        self.g = g
+        self.f = f
+        self.depth = depth
+        # children[code] :: SMANode held in memory
+        self.children = {}
+        # forgotten[code] :: backed up f of an evicted child
+        self.forgotten = {}
+        self.forgottenF = float('inf')
+        self.expanded = False
+
+class SMAStar(SearchSolver):
+    options = ('nodeCap', 'forgottenCap', 'heuristicCacheSize', 'telemetry')
+
+    def __init__( self, initialState, neighborGen, costCalc, isGoal, heuristic,
+                  nodeCap=1000000, forgottenCap=None, heuristicCacheSize=None, telemetry=False ):
+        stats = self.createStats(telemetry)
+        self.heuristic = stats.timer('heuristic', self.cachedHeuristic(heuristic, heuristicCacheSize))
+        self.expand = createExpander(neighborGen, costCalc, stats)
+        self.nodeCap = max(2, nodeCap)
+        self.forgottenCap = self.nodeCap if forgottenCap is None else forgottenCap
+        # Frontier ordered by lowest f then deepest, leaves by highest f then shallowest
+        self.frontier = Heap()
+        self.leaves = Heap()
+        # inMemory[key] :: the node with the lowest g of that state
+        self.inMemory = {}
+        self.numNodes = 1
+        # numForgotten :: forgotten entries over all nodes, at most forgottenCap
+        self.numForgotten = 0
+        self.expanding = None
+
+        rootNode = SMANode(initialState, None, None, None, 0, self.heuristic(initialState), 0)
+        self.root = rootNode
+        self.inMemory[rootNode.key] = rootNode
+        self.frontier.push(rootNode, (rootNode.f, 0))
+        while self.frontier:
+            selectNode = self.frontier.pop()
+            if self._priority(selectNode) == float('inf'):
+                break
+            if not selectNode.expanded and isGoal(selectNode.boardState):
+                self._foundGoal(initialState, selectNode)
+                break
+            self._expandNode(selectNode)
+            stats.observe(len(self.frontier), self.numNodes + self.numForgotten)
+
+    def _priority(self, node):
+        return node.forgottenF if node.expanded else node.f
+
+    def _expandNode(self, node):
+        # node stays out of leaves while it gains children, so it is never evicted under them
+        stats = self.stats
+        self.leaves.remove(node)
+        self.expanding = node
+        floorF = self._priority(node)
+        keys, codes, costs, child = self.expand(node.boardState)
+        stats.expanded += 1
+        stats.generated += len(keys)
+        candidates = []
+        for key, code, stepCost in zip(keys, codes, costs):
+            if code in node.children:
+                continue
+            g = node.g + stepCost
+            other = self.inMemory.get(key)
+            if other is not None and other.g <= g:
+                stats.exploredHits += 1
+                continue
+            newState, action = child(code)
+            # An evicted child gets back the f backed up into it
+            f = max(g + self.heuristic(newState), node.forgotten.get(code, floorF))
+            candidates.append((f, key, code, action, g, newState))
+
+        # Only the best children are added, the others are left forgotten
+        bestF = min([candidate[0] for candidate in candidates] or [float('inf')])
+        node.forgottenF = float('inf')
+        for f, key, code, action, g, newState in candidates:
+            if f > bestF:
+                node.forgottenF = min(node.forgottenF, f)
+                continue
+            if self.numNodes >= self.nodeCap:
+                evicted = self._evictFor(f, node.depth + 1)
+                if evicted is None:
+                    # Memory is taken by the current path
+                    continue
+                if not evicted:
+                    node.forgottenF = min(node.forgottenF, f)
+                    continue
+            if code in node.forgotten:
+                del node.forgotten[code]
+                self.numForgotten -= 1
+            newNode = SMANode(newState, node, code, action, g, f, node.depth + 1)
+            node.children[code] = newNode
+            self.inMemory[key] = newNode
+            self.numNodes += 1
+            self.frontier.push(newNode, (f, -newNode.depth))
+            self.leaves.push(newNode, (-f, newNode.depth))
+
+        self.expanding = None
+        node.expanded = True
+        if node.forgottenF < float('inf'):
+            self.frontier.push(node, (node.forgottenF, -node.depth))
+        self._backup(node)
+        if not node.children and node is not self.root:
+            self.leaves.push(node, (-node.f, node.depth))
+
+    def _evictFor(self, f, depth):
+        # Evicts the worst leaf if it is worse than a new node at f and depth,
+        # None when there is no leaf to evict
+        if not self.leaves:
+            return None
+        leaf = self.leaves.peek()
+        if (-leaf.f, leaf.depth) > (-f, depth):
+            return False
+        self.leaves.pop()
+        self.frontier.remove(leaf)
+        if self.inMemory.get(leaf.key) is leaf:
+            del self.inMemory[leaf.key]
+        self.numNodes -= 1
+        self.numForgotten -= len(leaf.forgotten)
+
+        parent = leaf.parent
+        del parent.children[leaf.code]
+        if leaf.expanded and self.numForgotten < self.forgottenCap:
+            # Only an expanded leaf has an f backed up from below worth keeping
+            parent.forgotten[leaf.code] = leaf.f
+            self.numForgotten += 1
+        parent.forgottenF = min(parent.forgottenF, leaf.f)
+        if parent.expanded and parent is not self.expanding:
+            if parent.forgottenF < float('inf'):
+                self.frontier.push(parent, (parent.forgottenF, -parent.depth))
+            if not parent.children and parent is not self.root:
+                self.leaves.push(parent, (-parent.f, parent.depth))
+        return True
+
+    def _backup(self, node):
+        # Raises f of node and its ancestors to the lowest f below them
+        while node is not None and node.expanded:
+            lowestF = min([c.f for c in node.children.values()] + [node.forgottenF])
+            if not lowestF > node.f:
+                break
+            node.f = lowestF
+            if not node.children and node is not self.root:
+                self.leaves.push(node, (-node.f, node.depth))
+            node = node.parent
+
+    def _foundGoal(self, initialState, goalNode):
+        self.initialState = initialState
+        path = []
+        node = goalNode
+        while node is not None:
+            path.append(SearchNode(node.boardState, None, node.action, node.g, node.depth))
+            node = node.parent
+        path.reverse()
+        self.searchNodePath = path
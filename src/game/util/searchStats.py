@@ -0,0 +1,94 @@
+"""
+Michael Harrington
+
+This file provides search telemetry. Solvers count their expansions,
+generated nodes and duplicate hits and track the peak frontier and
+closed set sizes. When timed, the work a solver hands out is wrapped to
+add up the time spent in each phase: successors for generating moves,
+children for building successor states, heuristic and cost. A phase
+only shows up in times once something timed under it has run. What is
+left of the time up to the last observe goes to search, the solver's
+own work on its frontier and closed set, so the phases add up to the
+time the search took.
+"""
+
+from time import time
+
+class SearchStats():
+    def __init__(self, timed=False):
+        self.timed = timed
+        self.expanded = 0
+        self.generated = 0
+        # Generated states dropped for being explored or already in the frontier
+        self.exploredHits = 0
+        self.frontierHits = 0
+        self.peakFrontier = 0
+        self.peakClosed = 0
+        self.times = {}
+        self.startTime = time()
+        self.endTime = None
+
+    def observe(self, frontierSize, closedSize):
+        if frontierSize > self.peakFrontier:
+            self.peakFrontier = frontierSize
+        if closedSize > self.peakClosed:
+            self.peakClosed = closedSize
+        if self.timed:
+            self.endTime = time()
+
+    def timer(self, phase, func):
+        if not self.timed:
+            return func
+        times = self.times
+        def timedFunc(*args):
+            startTime = time()
+            try:
+                return func(*args)
+            finally:
+                times[phase] = times.get(phase, 0.0) + time() - startTime
+
+        return timedFunc
+
+    def generatorTimer(self, phase, func):
+        # Times each step of the generators func returns
+        if not self.timed:
+            return func
+        times = self.times
+        def timedFunc(*args):
+            items = iter(func(*args))
+            while True:
+                startTime = time()
+                try:
+                    item = next(items)
+                finally:
+                    times[phase] = times.get(phase, 0.0) + time() - startTime
+                yield item
+
+        return timedFunc
+
+    def merge(self, other):
+        # Adds in the counts of another search, peaks of parallel searches add up
+        for name, value in other.items():
+            if name == 'times':
+                for phase, seconds in value.items():
+                    self.times[phase] = self.times.get(phase, 0.0) + seconds
+            elif name != 'timed':
+                setattr(self, name, getattr(self, name) + value)
+
+    def phaseTimes(self):
+        times = dict(self.times)
+        # Merged stats bring the search time of their own solver
+        if self.timed and 'search' not in times:
+            elapsed = (self.endTime or time()) - self.startTime
+            times['search'] = max(0.0, elapsed - sum(times.values()))
+        return times
+
+    def toDict(self):
+        return { 'expanded': self.expanded,
+                 'generated': self.generated,
+                 'exploredHits': self.exploredHits,
+                 'frontierHits': self.frontierHits,
+                 'peakFrontier': self.peakFrontier,
+                 'peakClosed': self.peakClosed,
+                 'timed': self.timed,
+                 'times': self.phaseTimes() }
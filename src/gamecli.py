@@ -9,28 +9,59 @@ addition of a gradient cost field dubbed a radiation field.
 """
 
 from cmd import Cmd
+from glob import glob
+import os
 
 from clilib.helpers import isInputPiped
+from game.backwardSearch import createBoatBackwardSearch
 from game.heuristic import ( createGreedyHeuristic,
                              createSmartHeuristic,
                              createAdmissableHeuristic,
-                             createConsistentHeuristic
+                             createConsistentHeuristic,
+                             createBoatDistanceHeuristic,
+                             createPatternDatabaseHeuristic
                            )
+from game.batchSolver import BatchJob, BatchSolver
 from game.gameSolver import GameSolver
-from game.util.pathFinders import BFTS, IDDFGS, GrBFGS, AStarGS
+from game.readPuzzleInput import getStateFromFile
+from game.solutionCache import SolutionCache
+from game.util.pathFinders import ( BFTS, IDDFGS, GrBFGS, AStarGS, ARAStar,
+                                    BidirectionalAStar, HDAStar, IDAStar, SMAStar )
+from game.util.heap import ( fifoTieBreak,
+                             lifoTieBreak,
+                             highGTieBreak,
+                             createRandomTieBreak
+                           )
 
 class GameCLI(Cmd):
     heuristicDict = {
             'smart': createSmartHeuristic,
             'admissable': createAdmissableHeuristic,
             'consistent': createConsistentHeuristic,
+            'boat-distance': createBoatDistanceHeuristic,
+            'pdb': createPatternDatabaseHeuristic,
         }
     algorithmDict = {
             'asgs': (AStarGS, True),
+            'arastar': (ARAStar, True),
+            'bidir': (BidirectionalAStar, True),
+            'hdastar': (HDAStar, True),
+            'idastar': (IDAStar, True),
+            'smastar': (SMAStar, True),
             'grbfgs':  (GrBFGS,  True),
             'id-dfgs': (IDDFGS,  False),
             'bfts':    (BFTS,    False),
         }
+    # Tie break policies are created from an optional seed for each solve
+    tieBreakDict = {
+            'fifo':   lambda seed: fifoTieBreak,
+            'lifo':   lambda seed: lifoTieBreak,
+            'high-g': lambda seed: highGTieBreak,
+            'random': createRandomTieBreak,
+        }
+    # Options that never change the path found, left out of solver names
+    pathNeutralOptions = ('telemetry', 'heuristicCacheSize')
+
     def __init__(self):
         Cmd.__init__(self)
         self.prompt = 'Isotope Boat>'
@@ -38,6 +69,11 @@ class GameCLI(Cmd):
         self.heuristic = createSmartHeuristic
         self.useHeuristic = True
         self.algorithm = AStarGS
+        self.tieBreak = (self.tieBreakDict['fifo'], None)
+        # Keyword options handed to algorithms that list them
+        self.options = {'createBackward': createBoatBackwardSearch}
+        self.solutionCache = None
+        self.movePruning = False
 
     """
     These functions control the behavior of our cli
@@ -67,22 +103,160 @@ class GameCLI(Cmd):
         print 'solve <inputFile> <outputFile>'
         print 'Solves the input puzzle file writing output to output file'
 
+    def createAlgConstructor(self, algorithm, useHeuristic, heuristic):
+        options = dict( (name, value) for name, value in self.options.items()
+                        if name in algorithm.options )
+        if 'tieBreak' in algorithm.options:
+            createTieBreak, seed = self.tieBreak
+            options['tieBreak'] = createTieBreak(seed)
+        movePruning = self.movePruning
+        def algConstructor(i, n, c, g):
+            i.context.movePruning = movePruning
+            if useHeuristic:
+                return algorithm(i, n, c, g, heuristic(i), **options)
+            return algorithm(i, n, c, g, **options)
+
+        return algConstructor
+
+    def createSolverName(self, algorithm, useHeuristic, heuristic):
+        # Names a solver setup for the solution cache, every setting that
+        # can change the path found is part of the name
+        name = algorithm.__name__
+        if useHeuristic:
+            name += ':' + heuristic.__name__
+        settings = [ '{}={}'.format(option, getattr(value, '__name__', value))
+                     for option, value in sorted(self.options.items())
+                     if option in algorithm.options and option not in self.pathNeutralOptions ]
+        if 'tieBreak' in algorithm.options:
+            createTieBreak, seed = self.tieBreak
+            settings.append('tieBreak={}:{}'.format(self.tieBreakName(), seed))
+        if self.movePruning:
+            settings.append('movePruning')
+        if settings:
+            name += '[' + ','.join(settings) + ']'
+        return name
+
     def do_solve(self, line):
         # Set up solving inst
-        if self.useHeuristic:
-            algConstructor = lambda i, n, c, g: self.algorithm(i, n, c, g, self.heuristic(i))
-        else:
-            algConstructor = lambda i, n, c, g: self.algorithm(i, n, c, g)
-        solver = GameSolver(algConstructor)
+        algConstructor = self.createAlgConstructor(self.algorithm, self.useHeuristic, self.heuristic)
+        solverName = self.createSolverName(self.algorithm, self.useHeuristic, self.heuristic)
+        solver = GameSolver(algConstructor, self.solutionCache, solverName)
         # Solve
         inFile, outFile = line.split()
-        if solver.runInputFile('puzzles/' + inFile):
+        pathFound = solver.runInputFile('puzzles/' + inFile)
+        if self.options.get('telemetry'):
+            with open(self.telemetryPath('solutions/' + outFile), 'w') as fileObj:
+                fileObj.write(solver.strTelemetry())
+        for incumbent in getattr(solver.pathSolver, 'incumbents', ()):
+            bound = 'unknown' if incumbent['bound'] is None else '{:.3f}'.format(incumbent['bound'])
+            print 'Incumbent cost {} within {} of optimal (weight {}, {} expanded)'.format(
+                incumbent['pathCost'], bound, incumbent['weight'], incumbent['expanded'] )
+        if pathFound:
             output = solver.strOutput()
             with open('solutions/' + outFile, 'w') as fileObj:
                 fileObj.write(output)
+        elif solver.impossible is not None:
+            print '(Error) No solution found, {}'.format(solver.impossible)
+        elif not solver.pathSolver.complete:
+            print '(Error) No solution found, search budget exhausted'
         else:
             print '(Error) No solution found'
 
+    def help_solvebatch(self):
+        print 'solvebatch <glob|@manifest> <algorithm[:heuristic]>... [timeout=<seconds>] [jobs=<count>]'
+        print 'Solves every matching puzzle file with every algorithm over a pool of processes'
+        print 'A manifest lists one puzzle file per line, paths are taken as given'
+        print 'Solutions are written to solutions/<puzzle path>_<algorithm>[_<heuristic>].txt'
+        print 'as each job finishes, keeping the directories of the puzzle path'
+
+    def do_solvebatch(self, line):
+        args = line.split()
+        if not args:
+            return
+        timeout = None
+        processes = None
+        combos = []
+        for arg in args[1:]:
+            if arg.startswith('timeout='):
+                timeout = float(arg[len('timeout='):])
+            elif arg.startswith('jobs='):
+                processes = int(arg[len('jobs='):])
+            else:
+                algName, _, heurName = arg.lower().partition(':')
+                if algName not in self.algorithmDict or (heurName and heurName not in self.heuristicDict):
+                    print '(Error) Unknown algorithm or heuristic: ' + arg
+                    return
+                combos.append((algName, heurName))
+
+        if args[0].startswith('@'):
+            with open(args[0][1:]) as fileObj:
+                paths = [path.strip() for path in fileObj if path.strip() and not path.startswith('#')]
+        else:
+            paths = sorted(glob(args[0]))
+
+        jobs = []
+        outputs = {}
+        for path in paths:
+            for algName, heurName in combos:
+                algorithm, useHeuristic = self.algorithmDict[algName]
+                if useHeuristic:
+                    heurName = heurName or self.heuristicName()
+                    heuristic = self.heuristicDict[heurName]
+                else:
+                    heurName = '-'
+                    heuristic = None
+                algConstructor = self.createAlgConstructor(algorithm, useHeuristic, heuristic)
+                solverName = self.createSolverName(algorithm, useHeuristic, heuristic)
+                outputPath = self.batchOutputPath(path, [algName] + ([heurName] if useHeuristic else []))
+                if outputs.setdefault(outputPath, os.path.realpath(path)) != os.path.realpath(path):
+                    print '(Error) {} and {} would both write {}'.format(outputs[outputPath], path, outputPath)
+                    return
+                telemetryPath = None
+                if self.options.get('telemetry'):
+                    telemetryPath = self.telemetryPath(outputPath)
+                jobs.append(BatchJob( path, outputPath, algName, heurName, algConstructor,
+                                      self.solutionCache, solverName, telemetryPath ))
+
+        for outputDir in set(os.path.dirname(job.outputPath) for job in jobs):
+            if not os.path.isdir(outputDir):
+                os.makedirs(outputDir)
+        BatchSolver(processes, timeout).run(jobs)
+        rowFormat = '{:<24} {:<10} {:<14} {:<8} {:>8} {:>10}'
+        print rowFormat.format('puzzle', 'algorithm', 'heuristic', 'status', 'cost', 'time (s)')
+        for job in jobs:
+            totalTime = '-' if job.totalTime is None else '{:.3f}'.format(job.totalTime / 1e6)
+            pathCost = '-' if job.pathCost is None else job.pathCost
+            print rowFormat.format( job.inputPath, job.algName, job.heurName,
+                                    job.status, pathCost, totalTime )
+
+    def batchOutputPath(self, inputPath, suffixes):
+        # Solution path of a batch puzzle, under solutions/ at the puzzle's path relative to the
+        # working directory, or under solutions/_abs at its absolute path when it lies outside
+        relPath = os.path.relpath(inputPath)
+        if relPath == os.pardir or relPath.startswith(os.pardir + os.sep):
+            relPath = os.path.join('_abs', os.path.abspath(inputPath).lstrip(os.sep))
+        return os.path.join('solutions', '_'.join([os.path.splitext(relPath)[0]] + suffixes) + '.txt')
+
+    def telemetryPath(self, outputPath):
+        return os.path.splitext(outputPath)[0] + '.telemetry.json'
+
+    def tieBreakName(self):
+        for name, createTieBreak in self.tieBreakDict.items():
+            if createTieBreak is self.tieBreak[0]:
+                return name
+
+    def heuristicName(self):
+        for name, heuristic in self.heuristicDict.items():
+            if heuristic is self.heuristic:
+                return name
+
+    def help_buildpdb(self):
+        print 'buildpdb <inputFile>'
+        print 'Builds and saves the pattern databases of the input puzzle file'
+
+    def do_buildpdb(self, line):
+        createPatternDatabaseHeuristic(getStateFromFile('puzzles/' + line.strip()))
+
     def help_heuristic(self):
         print 'heuristic <heuristic>'
         print 'Selects the heuristic to use for solving'
@@ -101,6 +275,133 @@ class GameCLI(Cmd):
         if line in self.algorithmDict:
             self.algorithm, self.useHeuristic = self.algorithmDict[line]
 
+    def help_tiebreak(self):
+        print 'tiebreak <fifo|lifo|high-g|random> [seed]'
+        print 'Selects how frontier entries with equal priority are ordered'
+
+    def do_tiebreak(self, line):
+        args = line.lower().split()
+        if args and args[0] in self.tieBreakDict:
+            seed = int(args[1]) if len(args) > 1 else None
+            self.tieBreak = (self.tieBreakDict[args[0]], seed)
+
+    def help_heuristiccache(self):
+        print 'heuristiccache <size|off>'
+        print 'Caches heuristic values of the most recently seen states'
+
+    def do_heuristiccache(self, line):
+        line = line.strip().lower()
+        if line == 'off':
+            self.options.pop('heuristicCacheSize', None)
+        elif line.isdigit():
+            self.options['heuristicCacheSize'] = int(line)
+
+    def help_budget(self):
+        print 'budget <time|expansions> <limit|off>'
+        print 'Caps the seconds or node expansions of anytime algorithms'
+
+    def do_budget(self, line):
+        args = line.lower().split()
+        if len(args) != 2 or args[0] not in ('time', 'expansions'):
+            return
+        option = 'timeLimit' if args[0] == 'time' else 'expansionLimit'
+        if args[1] == 'off':
+            self.options.pop(option, None)
+        elif args[0] == 'time':
+            self.options[option] = float(args[1])
+        else:
+            self.options[option] = int(args[1])
+
+    def help_weight(self):
+        print 'weight <initialWeight> [weightStep]'
+        print 'Sets the starting heuristic weight of anytime algorithms and how fast it drops'
+
+    def do_weight(self, line):
+        args = line.split()
+        if args:
+            self.options['initialWeight'] = float(args[0])
+        if len(args) > 1:
+            self.options['weightStep'] = float(args[1])
+
+    def help_nodecap(self):
+        print 'nodecap <count|off>'
+        print 'Sets how many search nodes memory bounded algorithms may hold'
+
+    def do_nodecap(self, line):
+        line = line.strip().lower()
+        if line == 'off':
+            self.options.pop('nodeCap', None)
+        elif line.isdigit():
+            self.options['nodeCap'] = int(line)
+
+    def help_forgottencap(self):
+        print 'forgottencap <count|off>'
+        print 'Sets how many backed up f values of evicted nodes SMA* may keep on top of nodecap'
+        print 'off keeps as many as nodecap'
+
+    def do_forgottencap(self, line):
+        line = line.strip().lower()
+        if line == 'off':
+            self.options.pop('forgottenCap', None)
+        elif line.isdigit():
+            self.options['forgottenCap'] = int(line)
+
+    def help_boundgrowth(self):
+        print 'boundgrowth <ratio|off>'
+        print 'Sets how fast IDA* raises its bound, about ratio times the work per iteration'
+        print '1 raises it to the next f-value, off uses the default of 2'
+
+    def do_boundgrowth(self, line):
+        line = line.strip().lower()
+        if line == 'off':
+            self.options.pop('boundGrowth', None)
+        elif line:
+            self.options['boundGrowth'] = max(1.0, float(line))
+
+    def help_workers(self):
+        print 'workers <count|auto>'
+        print 'Sets how many processes parallel algorithms search with'
+
+    def do_workers(self, line):
+        line = line.strip().lower()
+        if line == 'auto':
+            self.options.pop('workers', None)
+        elif line.isdigit() and int(line) > 0:
+            self.options['workers'] = int(line)
+
+    def help_solutioncache(self):
+        print 'solutioncache <on|verify|off> [maxEntries]'
+        print 'Reuses solutions of puzzles already solved with the same algorithm and heuristic'
+        print 'verify replays a cached solution before using it'
+
+    def do_solutioncache(self, line):
+        args = line.lower().split()
+        if args and args[0] == 'off':
+            self.solutionCache = None
+        elif args and args[0] in ('on', 'verify'):
+            maxEntries = int(args[1]) if len(args) > 1 else 1000
+            self.solutionCache = SolutionCache(maxEntries=maxEntries, verify=args[0] == 'verify')
+
+    def help_telemetry(self):
+        print 'telemetry <on|off>'
+        print 'Writes search counts and phase timings as json next to each solution'
+
+    def do_telemetry(self, line):
+        line = line.strip().lower()
+        if line == 'on':
+            self.options['telemetry'] = True
+        elif line == 'off':
+            self.options.pop('telemetry', None)
+
+    def help_movepruning(self):
+        print 'movepruning <on|off>'
+        print 'Only moves animals that can still get in the way of the boat, optimal costs are kept'
+
+    def do_movepruning(self, line):
+        line = line.strip().lower()
+        if line in ('on', 'off'):
+            self.movePruning = line == 'on'
+
     """
     These functions exit the cli command loop
     """
@@ -0,0 +1,119 @@
+"""
+Michael Harrington
+
+This file provides what the tests share: the solver sources on the
+path and loading of the shipped puzzles
+"""
+
+import os
+import sys
+from random import Random
+
+rootDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(rootDir, 'src'))
+
+from game.readPuzzleInput import getStateFromFile
+from game.gameRules import createBoardState, neighborGen, costCalc, isGoalState, Boat, Alligator, Turtle, Tree
+from game.util.cartMath import Point, Rectangle, CardinalRay
+
+# Optimal path costs of the shipped puzzles
+optimalCosts = { 'examplePuzzle.txt': 73,
+                 'puzzle1.txt': 210,
+                 'puzzle2.txt': 384,
+                 'puzzle3.txt': 723,
+                 'puzzle4.txt': 841,
+                 'puzzle5.txt': 480 }
+
+def puzzlePath(name):
+    return os.path.join(rootDir, 'puzzles', name)
+
+def loadPuzzle(name):
+    return getStateFromFile(puzzlePath(name))
+
+def randomPuzzles(count, seed, size=5, maxAnimals=3, maxTrees=3):
+    # Random valid puzzles on a size x size board, as initial states
+    rng = Random(seed)
+    randomRay = lambda: CardinalRay(rng.randrange(size), rng.randrange(size), rng.randrange(4))
+    randomPoint = lambda: Point(rng.randrange(size), rng.randrange(size))
+    puzzles = []
+    while len(puzzles) < count:
+        numAnimals = rng.randint(0, maxAnimals)
+        numAlligators = rng.randint(0, numAnimals)
+        boat = randomRay()
+        alligators = [randomRay() for _ in range(numAlligators)]
+        turtles = [randomRay() for _ in range(numAnimals - numAlligators)]
+        trees = [randomPoint() for _ in range(rng.randint(0, maxTrees))]
+        objs = ( [Boat(boat, 0)] + [Alligator(ray, 0) for ray in alligators]
+               + [Turtle(ray, 0) for ray in turtles] + [Tree(point) for point in trees] )
+        if validPlacement(objs, size):
+            # Every cell keeps positive rads
+            decayFactor = rng.randint(1, 3)
+            radMag = decayFactor * 2 * size + rng.randint(1, 20)
+            puzzles.append(createBoardState( Rectangle(size, size), randomPoint(), radMag, decayFactor,
+                                             boat, randomPoint(), alligators, turtles, trees ))
+    return puzzles
+
+def validPlacement(objs, size):
+    # Every object on the board and no two on one cell
+    covered = set()
+    for obj in objs:
+        space = set((point.x, point.y) for point in obj.space)
+        if covered & space or not all(0 <= x < size and 0 <= y < size for x, y in space):
+            return False
+        covered |= space
+    return True
+
+def solve(algorithm, name, *args, **kwargs):
+    # Runs algorithm on a shipped puzzle, args follow the search functions
+    return algorithm(loadPuzzle(name), neighborGen, costCalc, isGoalState, *args, **kwargs)
+
+def replayCost(pathSolver):
+    # Cost of the solver's actions replayed from the initial state, None if one is illegal
+    boardStates = pathSolver.boardStatePath
+    if not all(boardStates) or not isGoalState(boardStates[-1]):
+        return None
+    return sum(costCalc(boardState) for boardState in boardStates[1:])
+
+def childPids(pid):
+    # Pids of the live processes whose parent is pid, read from /proc
+    pids = []
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            state, parentPid = processState(int(name))
+            if parentPid == pid and state != 'Z':
+                pids.append(int(name))
+    return pids
+
+def sessionProcesses():
+    # Live processes in the session of this one, other than itself
+    ownSession = processSession(os.getpid())
+    pids = set()
+    for name in os.listdir('/proc'):
+        if name.isdigit() and int(name) != os.getpid():
+            pid = int(name)
+            if processAlive(pid) and processSession(pid) == ownSession:
+                pids.add(pid)
+    return pids
+
+def processAlive(pid):
+    state, parentPid = processState(pid)
+    return state is not None and state != 'Z'
+
+def processState(pid):
+    # (state, parent pid) of a process, (None, None) once it is gone
+    fields = _statFields(pid)
+    if fields is None:
+        return None, None
+    return fields[0], int(fields[1])
+
+def processSession(pid):
+    fields = _statFields(pid)
+    return fields and int(fields[3])
+
+def _statFields(pid):
+    # Fields of /proc/<pid>/stat after the command name, None once it is gone
+    try:
+        with open('/proc/{}/stat'.format(pid)) as fileObj:
+            return fileObj.read().rsplit(')', 1)[1].split()
+    except IOError:
+        return None
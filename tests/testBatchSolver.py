@@ -0,0 +1,108 @@
+"""
+Michael Harrington
+
+This file tests the batch solver
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from puzzleFixtures import optimalCosts, puzzlePath, sessionProcesses
+from gamecli import GameCLI
+from game.batchSolver import BatchJob, BatchSolver
+from game.heuristic import createBoatDistanceHeuristic
+from game.util.pathFinders import AStarGS, HDAStar
+
+def solveAStar(i, n, c, g):
+    return AStarGS(i, n, c, g, createBoatDistanceHeuristic(i))
+
+def solveHDAStar(i, n, c, g):
+    return HDAStar(i, n, c, g, createBoatDistanceHeuristic(i), workers=2)
+
+def solveWithHelper(i, n, c, g):
+    # Starts a process that knows nothing of the job and never ends on its own
+    helper = multiprocessing.Process(target=time.sleep, args=(60,))
+    helper.start()
+    time.sleep(60)
+
+class BatchSolverTest(unittest.TestCase):
+    def setUp(self):
+        self.outputDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDir)
+
+    def createJob(self, name, algName, algConstructor):
+        outputPath = os.path.join(self.outputDir, '{}_{}.txt'.format(name, algName))
+        return BatchJob(puzzlePath(name), outputPath, algName, 'boat-distance', algConstructor)
+
+    def testSolves(self):
+        jobs = [self.createJob(name, 'asgs', solveAStar) for name in ('examplePuzzle.txt', 'puzzle1.txt')]
+        BatchSolver(2).run(jobs)
+        for job in jobs:
+            self.assertEqual(job.status, 'solved')
+            self.assertEqual(job.pathCost, optimalCosts[os.path.basename(job.inputPath)])
+            self.assertTrue(os.path.exists(job.outputPath))
+
+    def testTimeoutLeavesNoProcesses(self):
+        jobs = [self.createJob('puzzle4.txt', 'hdastar', solveHDAStar) for i in range(2)]
+        before = sessionProcesses()
+        startTime = time.time()
+        BatchSolver(2, timeout=1.0).run(jobs)
+        self.assertEqual([job.status for job in jobs], ['timeout', 'timeout'])
+        self.assertLess(time.time() - startTime, 10)
+        self.assertEqual(sessionProcesses() - before, set())
+
+    def testTimeoutStopsProcessesTheJobStarted(self):
+        jobs = [self.createJob('examplePuzzle.txt', 'helper', solveWithHelper)]
+        before = sessionProcesses()
+        BatchSolver(1, timeout=0.5).run(jobs)
+        self.assertEqual(jobs[0].status, 'timeout')
+        self.assertEqual(sessionProcesses() - before, set())
+
+class SolveBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.oldDir = os.getcwd()
+        os.chdir(self.workDir)
+        # Same file name in two directories
+        for directory, name in (('a', 'examplePuzzle.txt'), ('b', 'puzzle1.txt')):
+            os.mkdir(directory)
+            shutil.copy(puzzlePath(name), os.path.join(directory, 'p.txt'))
+        self.cli = GameCLI()
+
+    def tearDown(self):
+        os.chdir(self.oldDir)
+        shutil.rmtree(self.workDir)
+
+    def solutionCost(self, path):
+        with open(path) as fileObj:
+            return int(fileObj.read().split('\n')[1])
+
+    def testSameNameInTwoDirectories(self):
+        self.cli.do_solvebatch('*/p.txt asgs:boat-distance jobs=1')
+        self.assertEqual(self.solutionCost('solutions/a/p_asgs_boat-distance.txt'), optimalCosts['examplePuzzle.txt'])
+        self.assertEqual(self.solutionCost('solutions/b/p_asgs_boat-distance.txt'), optimalCosts['puzzle1.txt'])
+
+    def testManifestPathsAsGiven(self):
+        outside = puzzlePath('puzzle2.txt')
+        with open('manifest.txt', 'w') as fileObj:
+            fileObj.write('\n'.join(['# puzzles', 'a/p.txt', os.path.abspath('b/p.txt'), outside]) + '\n')
+        self.cli.do_solvebatch('@manifest.txt asgs:boat-distance jobs=1')
+        self.assertEqual(self.solutionCost('solutions/a/p_asgs_boat-distance.txt'), optimalCosts['examplePuzzle.txt'])
+        self.assertEqual(self.solutionCost('solutions/b/p_asgs_boat-distance.txt'), optimalCosts['puzzle1.txt'])
+        outsidePath = os.path.join('solutions', '_abs', os.path.splitext(os.path.realpath(outside))[0].lstrip(os.sep))
+        self.assertEqual(self.solutionCost(outsidePath + '_asgs_boat-distance.txt'), optimalCosts['puzzle2.txt'])
+
+    def testOutputPathsKeepDirectories(self):
+        outputPaths = [ self.cli.batchOutputPath(path, ['asgs'])
+                        for path in ('a/b_c.txt', 'a_b/c.txt', 'a/b/c.txt', 'a_b_c.txt') ]
+        self.assertEqual(len(set(outputPaths)), 4)
+        self.assertEqual(self.cli.batchOutputPath('./a/p.txt', ['asgs']), 'solutions/a/p_asgs.txt')
+
+if __name__ == '__main__':
+    unittest.main()
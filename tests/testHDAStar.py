@@ -0,0 +1,73 @@
+"""
+Michael Harrington
+
+This file tests that HDAStar leaves no worker processes behind and
+spreads states evenly over its workers
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+import unittest
+
+from puzzleFixtures import optimalCosts, loadPuzzle, solve, replayCost, childPids, processAlive
+from game.gameRules import neighborGen, costCalc, isGoalState
+from game.heuristic import createBoatDistanceHeuristic
+from game.util.pathFinders import HDAStar, HDAShared
+
+def solveLongPuzzle():
+    initialState = loadPuzzle('puzzle4.txt')
+    HDAStar( initialState, neighborGen, costCalc, isGoalState,
+             createBoatDistanceHeuristic(initialState), workers=2 )
+
+def reachableKeys(name, limit):
+    # Keys of the first limit states found breadth first from the puzzle's start
+    initialState = loadPuzzle(name)
+    keys = set([initialState.key])
+    boardStates = [initialState]
+    for boardState in boardStates:
+        for newState, action in neighborGen(boardState):
+            if newState.key not in keys:
+                keys.add(newState.key)
+                boardStates.append(newState)
+                if len(keys) == limit:
+                    return keys
+    return keys
+
+class HDAStarTest(unittest.TestCase):
+    def testSolves(self):
+        initialState = loadPuzzle('puzzle2.txt')
+        solver = HDAStar( initialState, neighborGen, costCalc, isGoalState,
+                          createBoatDistanceHeuristic(initialState), workers=2 )
+        self.assertEqual(solver.pathCost, optimalCosts['puzzle2.txt'])
+        self.assertEqual(replayCost(solver), solver.pathCost)
+        self.assertEqual(childPids(os.getpid()), [])
+
+    def testOwnersBalanced(self):
+        keys = reachableKeys('puzzle3.txt', 5000)
+        for workers in (2, 4, 16, 32):
+            shared = HDAShared(workers)
+            counts = [0] * workers
+            for key in keys:
+                counts[shared.owner(key)] += 1
+            self.assertTrue(min(counts) > 0)
+            self.assertTrue(max(counts) < 1.25 * len(keys) / workers)
+
+    def testTerminatedSolveStopsWorkers(self):
+        process = multiprocessing.Process(target=solveLongPuzzle)
+        process.start()
+        deadline = time.time() + 30
+        workers = []
+        while len(workers) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+            workers = childPids(process.pid)
+        self.assertEqual(len(workers), 2)
+
+        os.kill(process.pid, signal.SIGTERM)
+        process.join(10)
+        self.assertFalse(process.is_alive())
+        self.assertEqual([pid for pid in workers if processAlive(pid)], [])
+
+if __name__ == '__main__':
+    unittest.main()
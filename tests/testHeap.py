@@ -0,0 +1,204 @@
+"""
+Michael Harrington
+
+This file tests the frontier priority queues: ordering, replaced and
+removed entries, the tie breaking policies, and that the bucket queue
+frontier searches exactly like the heap frontier
+"""
+
+import random
+import unittest
+
+from puzzleFixtures import loadPuzzle, solve
+from game.util.heap import ( Heap, IndexedHeap, BucketQueue, fifoTieBreak, lifoTieBreak,
+                             highGTieBreak, createRandomTieBreak )
+from game.util.pathFinders import AStarGS
+from game.heuristic import createBoatDistanceHeuristic
+
+def drain(queue):
+    elements = []
+    while queue:
+        elements.append(queue.pop())
+    return elements
+
+class QueueTest(unittest.TestCase):
+    queueClasses = (Heap, IndexedHeap, BucketQueue)
+
+    def testOrdersByValue(self):
+        rng = random.Random(3)
+        values = [rng.randint(0, 40) for _ in range(500)]
+        for queueClass in self.queueClasses:
+            queue = queueClass()
+            for key, val in enumerate(values):
+                queue.uniquePush((val, key), val, key)
+            self.assertEqual(len(queue), len(values))
+            self.assertEqual([val for val, key in drain(queue)], sorted(values))
+            self.assertEqual(len(queue), 0)
+
+    def testMonotonePushesBetweenPops(self):
+        # Pops interleaved with pushes no lower than the last value popped
+        rng = random.Random(5)
+        for queueClass in self.queueClasses:
+            queue = queueClass()
+            queue.uniquePush(0, 0, 0)
+            popped = []
+            key = 1
+            while queue:
+                val = queue.pop()
+                popped.append(val)
+                for _ in range(rng.randint(0, 3) if key < 2000 else 0):
+                    newVal = val + rng.randint(0, 7)
+                    queue.uniquePush(newVal, newVal, key)
+                    key += 1
+            self.assertEqual(popped, sorted(popped))
+            self.assertEqual(len(popped), key)
+
+    def testReplacedEntriesDropped(self):
+        for queueClass in self.queueClasses:
+            queue = queueClass()
+            for key in range(100):
+                queue.uniquePush(('old', key), 50 + key, key)
+            for key in range(0, 100, 2):
+                queue.uniquePush(('new', key), 10 + key, key)
+            # Not lower, so ignored
+            queue.uniquePush(('worse', 1), 51, 1)
+            queue.uniquePush(('worse', 2), 90, 2)
+            self.assertEqual(len(queue), 100)
+            if queueClass is Heap:
+                self.assertEqual(queue.peek(), ('new', 0))
+            else:
+                self.assertEqual(queue.get(2), ('new', 2))
+                self.assertEqual(queue.get(1), ('old', 1))
+                self.assertEqual(queue.get(100, 'missing'), 'missing')
+                self.assertEqual(queue.minValue(), 10)
+            elements = drain(queue)
+            self.assertEqual(len(elements), 100)
+            self.assertEqual(sorted(key for label, key in elements), range(100))
+            self.assertEqual([label for label, key in elements if key % 2 == 0], ['new'] * 50)
+            self.assertEqual([label for label, key in elements if key % 2 == 1], ['old'] * 50)
+
+    def testStaleEntriesCompacted(self):
+        for queueClass in (Heap, BucketQueue):
+            queue = queueClass()
+            for key in range(10):
+                queue.push(key, 100, key)
+            for round in range(50):
+                for key in range(10):
+                    queue.push(key, 99 - round, key)
+            self.assertEqual(len(queue), 10)
+            self.assertTrue(queue.staleCount <= len(queue))
+            self.assertEqual(drain(queue), range(10))
+
+    def testHeapRemove(self):
+        queue = Heap()
+        for key in range(10):
+            queue.push(key, key, key)
+        for key in (0, 3, 9):
+            queue.remove(key)
+        self.assertFalse(3 in queue)
+        self.assertEqual(queue.peek(), 1)
+        self.assertEqual(drain(queue), [1, 2, 4, 5, 6, 7, 8])
+
+    def testIndexedHeapPositions(self):
+        rng = random.Random(7)
+        queue = IndexedHeap()
+        for step in range(2000):
+            key = rng.randint(0, 300)
+            queue.uniquePush(key, rng.randint(0, 1000), key)
+            if step % 3 == 0:
+                queue.pop()
+            for pos, entry in enumerate(queue.heap):
+                self.assertEqual(queue.index[entry[3]], pos)
+                if pos:
+                    self.assertFalse(entry < queue.heap[(pos - 1) >> 1])
+        self.assertEqual(sorted(queue.elements()), sorted(queue.index))
+
+    def testBucketQueueRejectsLowerValue(self):
+        queue = BucketQueue()
+        queue.uniquePush('a', 5, 'a')
+        queue.uniquePush('b', 9, 'b')
+        self.assertEqual(queue.pop(), 'a')
+        self.assertEqual(queue.minValue(), 9)
+        self.assertRaises(ValueError, queue.uniquePush, 'c', 8, 'c')
+        self.assertFalse('c' in queue)
+        queue.uniquePush('c', 9, 'c')
+        self.assertEqual(drain(queue), ['b', 'c'])
+        # An emptied queue starts over from any value
+        queue.uniquePush('d', 1, 'd')
+        self.assertEqual(drain(queue), ['d'])
+
+    def testBucketQueueInfiniteLast(self):
+        inf = float('inf')
+        queue = BucketQueue()
+        queue.uniquePush('a', inf, 'a')
+        queue.uniquePush('b', 3, 'b')
+        self.assertEqual(queue.pop(), 'b')
+        queue.uniquePush('c', 7, 'c')
+        queue.uniquePush('d', inf, 'd')
+        self.assertEqual(queue.minValue(), 7)
+        self.assertEqual(drain(queue), ['c', 'a', 'd'])
+
+    def testBucketQueueLongRange(self):
+        # The cursor runs far past the first value without keeping every bucket
+        queue = BucketQueue()
+        queue.uniquePush(0, 0, 0)
+        for val in range(1, 5000):
+            self.assertEqual(queue.pop(), val - 1)
+            queue.uniquePush(val, val, val)
+        self.assertTrue(len(queue.buckets) < 200)
+
+class TieBreakTest(unittest.TestCase):
+    queueClasses = (Heap, IndexedHeap, BucketQueue)
+
+    def pushTies(self, queue):
+        # Equal values with g rising then falling, and one lower value pushed last
+        for order, g in enumerate([3, 5, 1, 5, 2]):
+            queue.uniquePush((order, g), 10, order, g)
+        queue.uniquePush(('low', 0), 4, 'low', 0)
+
+    def testFifo(self):
+        for queueClass in self.queueClasses:
+            queue = queueClass(fifoTieBreak)
+            self.pushTies(queue)
+            self.assertEqual(drain(queue), [('low', 0), (0, 3), (1, 5), (2, 1), (3, 5), (4, 2)])
+
+    def testLifo(self):
+        for queueClass in self.queueClasses:
+            queue = queueClass(lifoTieBreak)
+            self.pushTies(queue)
+            self.assertEqual(drain(queue), [('low', 0), (4, 2), (3, 5), (2, 1), (1, 5), (0, 3)])
+
+    def testHighG(self):
+        for queueClass in self.queueClasses:
+            queue = queueClass(highGTieBreak)
+            self.pushTies(queue)
+            # Equal g keeps push order
+            self.assertEqual(drain(queue), [('low', 0), (1, 5), (3, 5), (0, 3), (4, 2), (2, 1)])
+
+    def testRandomSeeded(self):
+        orders = []
+        for queueClass in self.queueClasses:
+            for seed in (1, 1, 2):
+                queue = queueClass(createRandomTieBreak(seed))
+                for order in range(30):
+                    queue.uniquePush(order, 10, order)
+                orders.append(drain(queue))
+        self.assertEqual(orders[0], orders[1])
+        self.assertNotEqual(orders[0], orders[2])
+        self.assertNotEqual(orders[0], range(30))
+        self.assertEqual(sorted(orders[0]), range(30))
+        # Every queue class draws the ties in the same order
+        self.assertEqual(orders[0::3], [orders[0]] * 3)
+
+class BucketFrontierTest(unittest.TestCase):
+    def testSearchesLikeHeap(self):
+        for tieBreak in (fifoTieBreak, lifoTieBreak, highGTieBreak):
+            heuristic = createBoatDistanceHeuristic(loadPuzzle('puzzle3.txt'))
+            heap = solve(AStarGS, 'puzzle3.txt', heuristic, tieBreak=tieBreak, bucketQueue=False)
+            buckets = solve(AStarGS, 'puzzle3.txt', heuristic, tieBreak=tieBreak, bucketQueue=True)
+            self.assertEqual(buckets.pathCost, heap.pathCost)
+            self.assertEqual(buckets.actionPath, heap.actionPath)
+            self.assertEqual(buckets.stats.expanded, heap.stats.expanded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Michael Harrington
+
+This file tests the path finder algorithms
+"""
+
+import unittest
+from itertools import count
+
+from puzzleFixtures import optimalCosts, loadPuzzle, solve, replayCost
+from game.gameRules import neighborGen, costCalc, isGoalState
+from game.util.pathFinders import DLGS, IDDFGS, IDAStar, BidirectionalAStar
+from game.backwardSearch import createBoatBackwardSearch
+from game.heuristic import createBoatDistanceHeuristic
+from game.util.searchStats import SearchStats
+
+class IterativeDeepeningTest(unittest.TestCase):
+    def naiveDeepening(self, name):
+        # DLGS iterations that start over each time
+        initialState = loadPuzzle(name)
+        stats = SearchStats()
+        for depthLimit in count():
+            solver = DLGS(initialState, neighborGen, costCalc, isGoalState, depthLimit, stats=stats)
+            if solver.pathFound or not solver.cutoff:
+                return solver, stats
+
+    def testReusedDepthsExpandLess(self):
+        for name in ('examplePuzzle.txt', 'puzzle1.txt', 'puzzle2.txt'):
+            solver = solve(IDDFGS, name)
+            naiveSolver, naiveStats = self.naiveDeepening(name)
+            self.assertTrue(solver.pathFound)
+            self.assertEqual(len(solver.actionPath), len(naiveSolver.actionPath))
+            self.assertEqual(replayCost(solver), solver.pathCost)
+            self.assertLess(solver.stats.expanded, naiveStats.expanded)
+
+class IDAStarTest(unittest.TestCase):
+    def solveIDA(self, name, **kwargs):
+        return solve(IDAStar, name, createBoatDistanceHeuristic(loadPuzzle(name)), **kwargs)
+
+    def testOptimal(self):
+        for name in ('examplePuzzle.txt', 'puzzle1.txt', 'puzzle2.txt', 'puzzle3.txt'):
+            solver = self.solveIDA(name)
+            self.assertEqual(solver.pathCost, optimalCosts[name])
+            self.assertEqual(replayCost(solver), solver.pathCost)
+
+    def testBoundGrowth(self):
+        # Overshooting bounds still end on the cheapest goal
+        for name in ('examplePuzzle.txt', 'puzzle2.txt'):
+            iterations = []
+            for boundGrowth in (1.0, 8.0, 1000.0):
+                solver = self.solveIDA(name, boundGrowth=boundGrowth)
+                self.assertEqual(solver.pathCost, optimalCosts[name])
+                iterations.append(len(solver.bounds))
+            self.assertEqual(iterations, sorted(iterations, reverse=True))
+
+    def testWithoutTable(self):
+        for name in ('examplePuzzle.txt', 'puzzle2.txt'):
+            solver = self.solveIDA(name, tableSize=0)
+            self.assertEqual(solver.pathCost, optimalCosts[name])
+
+class BidirectionalAStarTest(unittest.TestCase):
+    def testConstructedDirectly(self):
+        for name in ('examplePuzzle.txt', 'puzzle2.txt'):
+            initialState = loadPuzzle(name)
+            solver = BidirectionalAStar( initialState, neighborGen, costCalc, isGoalState,
+                                         createBoatDistanceHeuristic(initialState), createBoatBackwardSearch )
+            self.assertEqual(solver.pathCost, optimalCosts[name])
+            self.assertEqual(replayCost(solver), solver.pathCost)
+
+    def testBackwardSearchRequired(self):
+        initialState = loadPuzzle('examplePuzzle.txt')
+        self.assertRaises( TypeError, BidirectionalAStar, initialState, neighborGen, costCalc,
+                           isGoalState, createBoatDistanceHeuristic(initialState) )
+
+if __name__ == '__main__':
+    unittest.main()
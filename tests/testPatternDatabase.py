@@ -0,0 +1,85 @@
+"""
+Michael Harrington
+
+This file tests that pattern databases saved to disk and memory mapped
+back give the same costs as when built, and that a saved database is
+not used for a puzzle it was not built for
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from puzzleFixtures import loadPuzzle, puzzlePath, neighborGen
+from game.readPuzzleInput import getStateFromFile
+from game.patternDatabase import PatternDatabase, MappedTable, chooseAnimalSlots
+from game.heuristic import createBoatDistanceMap
+
+def reachableStates(initialState, limit):
+    # Up to limit states breadth first from initialState
+    states = [initialState]
+    seen = set([initialState.key])
+    for boardState in states:
+        for newState, action in neighborGen(boardState):
+            if newState.key not in seen and len(states) < limit:
+                seen.add(newState.key)
+                states.append(newState)
+    return states
+
+class PatternDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        self.initialState = loadPuzzle('puzzle2.txt')
+        distMap = createBoatDistanceMap(self.initialState.context)
+        self.slots = chooseAnimalSlots(self.initialState, distMap)[:2]
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def pdbPaths(self):
+        return sorted(name for name in os.listdir(self.cacheDir) if name.endswith('.pdb'))
+
+    def testMappedMatchesBuilt(self):
+        built = PatternDatabase(self.initialState, self.slots, self.cacheDir)
+        self.assertTrue(isinstance(built.table, array))
+        self.assertEqual(self.pdbPaths(), [built.puzzleHash(self.initialState) + '.pdb'])
+        mapped = PatternDatabase(self.initialState, self.slots, self.cacheDir)
+        self.assertTrue(isinstance(mapped.table, MappedTable))
+        self.assertEqual([mapped.table[index] for index in range(mapped.size)], list(built.table))
+        for boardState in reachableStates(self.initialState, 3000):
+            self.assertEqual(mapped.lookup(boardState.poses), built.lookup(boardState.poses))
+        self.assertTrue(any(0 < cost < float('inf') for cost in built.table))
+
+    def testChangedPuzzleRejectsStaleFile(self):
+        stale = PatternDatabase(self.initialState, self.slots, self.cacheDir)
+        with open(puzzlePath('puzzle2.txt')) as fileObj:
+            lines = fileObj.readlines()
+        # A stronger radiation source, everything else the same
+        radMag, radDecayFactor = lines[2].split()
+        lines[2] = '{} {}\n'.format(int(radMag) + 10, radDecayFactor)
+        changedPath = os.path.join(self.cacheDir, 'changed.txt')
+        with open(changedPath, 'w') as fileObj:
+            fileObj.writelines(lines)
+        changedState = getStateFromFile(changedPath)
+
+        changed = PatternDatabase(changedState, self.slots, self.cacheDir)
+        self.assertNotEqual(changed.puzzleHash(changedState), stale.puzzleHash(self.initialState))
+        self.assertTrue(isinstance(changed.table, array))
+        self.assertEqual(len(self.pdbPaths()), 2)
+        self.assertEqual(list(changed.table), list(changed.build(changedState.context)))
+        self.assertNotEqual(list(changed.table), list(stale.table))
+
+    def testTruncatedFileRebuilt(self):
+        built = PatternDatabase(self.initialState, self.slots, self.cacheDir)
+        path = os.path.join(self.cacheDir, self.pdbPaths()[0])
+        with open(path, 'r+b') as fileObj:
+            fileObj.truncate(os.path.getsize(path) // 2)
+        rebuilt = PatternDatabase(self.initialState, self.slots, self.cacheDir)
+        self.assertTrue(isinstance(rebuilt.table, array))
+        self.assertEqual(list(rebuilt.table), list(built.table))
+        self.assertTrue(isinstance(PatternDatabase(self.initialState, self.slots, self.cacheDir).table, MappedTable))
+
+if __name__ == '__main__':
+    unittest.main()
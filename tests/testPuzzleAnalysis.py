@@ -0,0 +1,87 @@
+"""
+Michael Harrington
+
+This file cross-checks the puzzle analysis against search over the full
+move tables: frozen animals and pruned moves must never change the
+optimal cost, and puzzles flagged impossible must have no path at all
+"""
+
+import unittest
+
+from puzzleFixtures import loadPuzzle, randomPuzzles, neighborGen, costCalc, isGoalState
+from game.util.pathFinders import AStarGS
+from game.heuristic import createBoatDistanceHeuristic
+
+shippedNames = ('examplePuzzle.txt', 'puzzle1.txt', 'puzzle2.txt', 'puzzle3.txt', 'puzzle5.txt')
+
+_randomPuzzles = []
+
+def sampledPuzzles():
+    # Random 5x5 and 6x6 puzzles, generated once for every test here
+    if not _randomPuzzles:
+        for size, maxAnimals, maxTrees in ((5, 5, 4), (6, 6, 6)):
+            _randomPuzzles.extend(randomPuzzles(300, 1, size=size, maxAnimals=maxAnimals, maxTrees=maxTrees))
+    return _randomPuzzles
+
+def optimalCost(initialState, heuristic=None):
+    # Cost of an optimal path with the context's current moves, None when there is none
+    if heuristic is None:
+        heuristic = createBoatDistanceHeuristic(initialState)
+    solver = AStarGS(initialState, neighborGen, costCalc, isGoalState, heuristic)
+    return (solver.pathCost if solver.pathFound else None), solver.stats.expanded
+
+def useAnalysedMoves(initialState, movePruning):
+    context = initialState.context
+    context.slotMoves = context.analysis.slotMoves
+    context.movePruning = movePruning
+
+def useFullMoveTables(initialState):
+    context = initialState.context
+    context.slotMoves = [table.moves for table in context.moveTables]
+    context.movePruning = False
+
+class PuzzleAnalysisTest(unittest.TestCase):
+    def assertAnalysisKeepsCost(self, initialState, movePruning):
+        # Returns whether the analysed moves expanded fewer states
+        useAnalysedMoves(initialState, movePruning)
+        analysedCost, analysedExpanded = optimalCost(initialState)
+        useFullMoveTables(initialState)
+        fullCost, fullExpanded = optimalCost(initialState)
+        self.assertEqual(analysedCost, fullCost)
+        return analysedExpanded < fullExpanded
+
+    def testShippedPuzzles(self):
+        for name in shippedNames:
+            initialState = loadPuzzle(name)
+            self.assertEqual(initialState.context.analysis.impossible, None)
+            self.assertAnalysisKeepsCost(initialState, False)
+            self.assertAnalysisKeepsCost(initialState, True)
+
+    def testFrozenSlotsKeepCost(self):
+        frozen = 0
+        for initialState in sampledPuzzles():
+            analysis = initialState.context.analysis
+            if analysis.impossible is None:
+                self.assertAnalysisKeepsCost(initialState, False)
+                frozen += len(analysis.relevant) < len(initialState.poses) - 1
+        self.assertTrue(frozen > 0)
+
+    def testMovePruningKeepsCost(self):
+        pruned = 0
+        for initialState in sampledPuzzles():
+            if initialState.context.analysis.impossible is None:
+                pruned += self.assertAnalysisKeepsCost(initialState, True)
+        self.assertTrue(pruned > 0)
+
+    def testImpossibleUnsolvable(self):
+        # Uniform cost search over the full move tables, so nothing of the analysis is trusted
+        impossible = 0
+        for initialState in sampledPuzzles():
+            if initialState.context.analysis.impossible is not None:
+                impossible += 1
+                useFullMoveTables(initialState)
+                self.assertEqual(optimalCost(initialState, lambda boardState: 0)[0], None)
+        self.assertTrue(impossible > 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Michael Harrington
+
+This file tests that SMAStar keeps its tree consistent while evicting,
+stays within its caps and still finds optimal paths under a tight node
+cap
+"""
+
+import unittest
+
+from puzzleFixtures import optimalCosts, loadPuzzle, solve, replayCost
+from game.util.pathFinders import SMAStar, AStarGS
+from game.heuristic import createBoatDistanceHeuristic
+
+"""
+SMAStar that counts evictions and the most nodes and forgotten entries
+held at once, with checkTree it also checks its tree after every
+expansion
+"""
+class CheckedSMAStar(SMAStar):
+    checkTree = True
+
+    def __init__(self, *args, **kwargs):
+        self.evictions = 0
+        self.problems = []
+        self.peakNodes = 0
+        self.peakRetained = 0
+        SMAStar.__init__(self, *args, **kwargs)
+
+    def _expandNode(self, node):
+        SMAStar._expandNode(self, node)
+        self.peakNodes = max(self.peakNodes, self.numNodes)
+        self.peakRetained = max(self.peakRetained, self.numNodes + self.numForgotten)
+        if self.checkTree:
+            self.problems.extend(self.treeProblems())
+
+    def _evictFor(self, f, depth):
+        evicted = SMAStar._evictFor(self, f, depth)
+        if evicted:
+            self.evictions += 1
+        return evicted
+
+    def treeProblems(self):
+        problems = []
+        leaves = set(self.leaves.registry)
+        nodes = [self.root]
+        for node in nodes:
+            nodes.extend(node.children.values())
+            if node in leaves and node.children:
+                problems.append('leaf with children at depth %d' % node.depth)
+            if node is not self.root and not node.children and node not in leaves:
+                problems.append('childless node missing from leaves at depth %d' % node.depth)
+            if set(node.children) & set(node.forgotten):
+                problems.append('child both held and forgotten at depth %d' % node.depth)
+        if len(nodes) != self.numNodes:
+            problems.append('%d nodes in the tree, %d counted' % (len(nodes), self.numNodes))
+        numForgotten = sum(len(node.forgotten) for node in nodes)
+        if numForgotten != self.numForgotten:
+            problems.append('%d forgotten entries, %d counted' % (numForgotten, self.numForgotten))
+        if leaves - set(nodes):
+            problems.append('evicted nodes left in leaves')
+        return problems
+
+class CountedSMAStar(CheckedSMAStar):
+    checkTree = False
+
+def solveSMA(name, nodeCap, algorithm=SMAStar, **kwargs):
+    heuristic = createBoatDistanceHeuristic(loadPuzzle(name))
+    return solve(algorithm, name, heuristic, nodeCap=nodeCap, **kwargs)
+
+class SMAStarTest(unittest.TestCase):
+    def testTreeInvariants(self):
+        for name, nodeCap in (('puzzle2.txt', 7), ('puzzle2.txt', 8), ('puzzle2.txt', 11), ('puzzle2.txt', 20)):
+            solver = solveSMA(name, nodeCap, CheckedSMAStar)
+            self.assertEqual(solver.problems, [])
+            self.assertTrue(solver.evictions > 0)
+            self.assertEqual(solver.pathCost, optimalCosts[name])
+
+    def testRetainsWithinCaps(self):
+        for forgottenCap in (None, 0, 50):
+            solver = solveSMA('puzzle5.txt', 1000, CountedSMAStar, forgottenCap=forgottenCap)
+            retainCap = 1000 + (1000 if forgottenCap is None else forgottenCap)
+            self.assertTrue(solver.peakNodes <= 1000)
+            self.assertTrue(solver.peakRetained <= retainCap)
+            self.assertTrue(solver.stats.peakClosed <= retainCap)
+            self.assertEqual(solver.pathCost, optimalCosts['puzzle5.txt'])
+
+    def testEvictingSolveMatchesAStar(self):
+        for name in ('puzzle3.txt', 'puzzle5.txt'):
+            solver = solveSMA(name, 1000, CountedSMAStar)
+            aStar = solve(AStarGS, name, createBoatDistanceHeuristic(solver.initialState))
+            self.assertTrue(solver.evictions > 0)
+            self.assertEqual(solver.pathCost, aStar.pathCost)
+            self.assertEqual(replayCost(solver), solver.pathCost)
+
+if __name__ == '__main__':
+    unittest.main()
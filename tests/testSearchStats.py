@@ -0,0 +1,48 @@
+"""
+Michael Harrington
+
+This file tests the search telemetry
+"""
+
+import time
+import unittest
+
+from puzzleFixtures import loadPuzzle, neighborGen, costCalc, isGoalState
+from game.heuristic import createBoatDistanceHeuristic, createConsistentHeuristic
+from game.util.pathFinders import AStarGS, GrBFGS, IDAStar, IDDFGS, BFTS
+
+class SearchStatsTest(unittest.TestCase):
+    def assertPhasesAddUp(self, algorithm, name, createHeuristic, expectedPhases):
+        initialState = loadPuzzle(name)
+        args = [createHeuristic(initialState)] if createHeuristic else []
+        startTime = time.time()
+        solver = algorithm(initialState, neighborGen, costCalc, isGoalState, *args, telemetry=True)
+        elapsed = time.time() - startTime
+        times = solver.stats.toDict()['times']
+        self.assertEqual(sorted(times), sorted(expectedPhases))
+        for phase, seconds in times.items():
+            self.assertGreater(seconds, 0, phase)
+        self.assertGreater(sum(times.values()), 0.9 * elapsed)
+        self.assertLessEqual(sum(times.values()), elapsed)
+
+    def testBatchExpansionPhases(self):
+        phases = ('successors', 'children', 'heuristic', 'search')
+        self.assertPhasesAddUp(AStarGS, 'puzzle3.txt', createBoatDistanceHeuristic, phases)
+        self.assertPhasesAddUp(AStarGS, 'puzzle3.txt', createConsistentHeuristic, phases)
+        self.assertPhasesAddUp(GrBFGS, 'puzzle5.txt', createBoatDistanceHeuristic, phases)
+        self.assertPhasesAddUp(IDAStar, 'puzzle3.txt', createBoatDistanceHeuristic, phases)
+
+    def testNeighborGenPhases(self):
+        phases = ('successors', 'cost', 'search')
+        self.assertPhasesAddUp(IDDFGS, 'puzzle2.txt', None, phases)
+        self.assertPhasesAddUp(BFTS, 'examplePuzzle.txt', None, phases)
+
+    def testUntimed(self):
+        initialState = loadPuzzle('examplePuzzle.txt')
+        solver = AStarGS( initialState, neighborGen, costCalc, isGoalState,
+                          createBoatDistanceHeuristic(initialState) )
+        self.assertEqual(solver.stats.toDict()['times'], {})
+        self.assertGreater(solver.stats.expanded, 0)
+
+if __name__ == '__main__':
+    unittest.main()
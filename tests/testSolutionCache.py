@@ -0,0 +1,103 @@
+"""
+Michael Harrington
+
+This file tests the solution cache
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from puzzleFixtures import optimalCosts, puzzlePath
+from gamecli import GameCLI
+from game.gameSolver import GameSolver
+from game.solutionCache import SolutionCache
+
+class SolutionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+        self.cli = GameCLI()
+        self.cli.solutionCache = SolutionCache(self.cacheDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def solve(self, name):
+        cli = self.cli
+        algConstructor = cli.createAlgConstructor(cli.algorithm, cli.useHeuristic, cli.heuristic)
+        solverName = cli.createSolverName(cli.algorithm, cli.useHeuristic, cli.heuristic)
+        solver = GameSolver(algConstructor, cli.solutionCache, solverName)
+        self.assertTrue(solver.runInputFile(puzzlePath(name)))
+        return solver
+
+    def testSameOptionsHit(self):
+        self.cli.do_algorithm('asgs')
+        self.cli.do_heuristic('boat-distance')
+        self.assertFalse(self.solve('puzzle1.txt').cached)
+        solver = self.solve('puzzle1.txt')
+        self.assertTrue(solver.cached)
+        self.assertEqual(solver.pathSolver.pathCost, optimalCosts['puzzle1.txt'])
+
+    def testOtherOptionsMiss(self):
+        cli = self.cli
+        cli.do_algorithm('grbfgs')
+        cli.do_heuristic('boat-distance')
+        self.solve('examplePuzzle.txt')
+        cli.do_tiebreak('lifo')
+        self.assertFalse(self.solve('examplePuzzle.txt').cached)
+        cli.do_tiebreak('random 7')
+        self.assertFalse(self.solve('examplePuzzle.txt').cached)
+        cli.do_movepruning('on')
+        self.assertFalse(self.solve('examplePuzzle.txt').cached)
+
+        cli.do_algorithm('smastar')
+        cli.do_nodecap('2000')
+        self.solve('examplePuzzle.txt')
+        cli.do_nodecap('off')
+        self.assertFalse(self.solve('examplePuzzle.txt').cached)
+
+    def testBudgetedSolveNotServedUnbudgeted(self):
+        cli = self.cli
+        cli.do_algorithm('arastar')
+        cli.do_heuristic('boat-distance')
+        cli.do_budget('expansions 300')
+        budgetCost = self.solve('puzzle3.txt').pathSolver.pathCost
+        self.assertGreater(budgetCost, optimalCosts['puzzle3.txt'])
+        cli.do_budget('expansions off')
+        solver = self.solve('puzzle3.txt')
+        self.assertFalse(solver.cached)
+        self.assertEqual(solver.pathSolver.pathCost, optimalCosts['puzzle3.txt'])
+
+    def testBudgetedSolveNotStored(self):
+        cli = self.cli
+        cli.do_algorithm('arastar')
+        cli.do_heuristic('boat-distance')
+        cli.do_budget('expansions 300')
+        solver = self.solve('puzzle3.txt')
+        self.assertFalse(solver.pathSolver.complete)
+        self.assertFalse(self.solve('puzzle3.txt').cached)
+
+        cli.do_budget('expansions off')
+        solver = self.solve('puzzle3.txt')
+        self.assertTrue(solver.pathSolver.complete)
+        self.assertTrue(self.solve('puzzle3.txt').cached)
+
+    def testBudgetExhaustedBeforeFirstSolution(self):
+        cli = self.cli
+        cli.do_algorithm('arastar')
+        cli.do_heuristic('boat-distance')
+        cli.do_budget('expansions 5')
+        cli.options['telemetry'] = True
+        algConstructor = cli.createAlgConstructor(cli.algorithm, cli.useHeuristic, cli.heuristic)
+        solver = GameSolver(algConstructor, cli.solutionCache, 'arastar-budget')
+        self.assertFalse(solver.runInputFile(puzzlePath('puzzle3.txt')))
+        self.assertFalse(solver.pathSolver.complete)
+        self.assertEqual(solver.pathSolver.incumbents, [])
+        telemetry = json.loads(solver.strTelemetry())
+        self.assertTrue(telemetry['budgetExhausted'])
+        self.assertFalse(telemetry['pathFound'])
+        self.assertEqual(telemetry['stats']['expanded'], 5)
+
+if __name__ == '__main__':
+    unittest.main()